@@ -0,0 +1,172 @@
+"""
+Encoder profile benchmark on synthetic Ken Burns scenes.
+
+Builds a few procedurally generated "illustration" canvases, renders them with the
+same Ken Burns frame code and crossfades as post-production (plus a subtitle band),
+stores a lossless reference per render quality, then encodes that reference with
+every encoder profile and reports encode wall time, output size and SSIM.
+
+Usage: python benchmarks/encoder_matrix.py [--qualities standard,final]
+           [--profiles generic,slowpan,...] [--scenes 3] [--scene-seconds 4] [--json out.json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import encoder_profiles, render_profiles, image_store  # noqa: E402
+from pipeline.module4_postproduction import _ken_burns_frame  # noqa: E402
+
+CROSSFADE = 0.5
+
+
+def ffmpeg_binary() -> str:
+    from moviepy.config import get_setting
+    return get_setting("FFMPEG_BINARY")
+
+
+def synthetic_canvas(seed: int) -> np.ndarray:
+    """
+    Soft gradient sky + blurred blobs + fine grain: roughly the texture statistics of
+    a claymation-style illustration, at the canonical canvas size.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = image_store.CANVAS_SIZE
+
+    top, bottom = rng.integers(0, 256, 3), rng.integers(0, 256, 3)
+    ramp = np.linspace(0, 1, height)[:, None, None]
+    base = (top * (1 - ramp) + bottom * ramp) * np.ones((1, width, 1))
+    image = Image.fromarray(base.astype(np.uint8))
+
+    draw = ImageDraw.Draw(image)
+    for _ in range(25):
+        x, y = rng.integers(0, width), rng.integers(0, height)
+        rx, ry = rng.integers(40, 400, 2)
+        draw.ellipse((x - rx, y - ry, x + rx, y + ry), fill=tuple(int(c) for c in rng.integers(0, 256, 3)))
+    image = image.filter(ImageFilter.GaussianBlur(radius=6))
+
+    grain = rng.normal(0, 4, (height, width, 1))
+    return np.clip(np.asarray(image, dtype=np.float32) + grain, 0, 255).astype(np.uint8)
+
+
+def subtitle_band(frame: np.ndarray, seed: int) -> np.ndarray:
+    """Darkened band with white 'text' blocks at the subtitle position."""
+    h, w = frame.shape[:2]
+    rng = np.random.default_rng(seed)
+    y0, y1 = int(h * 0.85), int(h * 0.85) + max(12, h // 18)
+    x0, x1 = int(w * 0.1), int(w * 0.9)
+    frame[y0:y1, x0:x1] = frame[y0:y1, x0:x1] // 2
+    x = x0 + 8
+    while x < x1 - 20:
+        word = int(rng.integers(10, 60) * h / 1080) + 4
+        frame[y0 + 4:y1 - 4, x:min(x + word, x1 - 8)] = 255
+        x += word + max(4, h // 108)
+    return frame
+
+
+def render_reference(path: str, canvases, quality: str, scene_seconds: float):
+    profile = render_profiles.get_render_profile(quality)
+    width, height = render_profiles.frame_size(profile)
+    fps = profile["fps"]
+
+    cmd = [ffmpeg_binary(), "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+           "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+           "-c:v", "libx264", "-preset", "ultrafast", "-qp", "0", "-pix_fmt", "yuv420p", path]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    step = scene_seconds - CROSSFADE
+    total = step * (len(canvases) - 1) + scene_seconds
+    for n in range(int(round(total * fps))):
+        t = n / fps
+        frame = None
+        for i, canvas in enumerate(canvases):
+            local_t = t - i * step
+            if not 0 <= local_t < scene_seconds:
+                continue
+            scene = _ken_burns_frame(canvas, local_t, scene_seconds, 1.15, -0.02, 0.02, (width, height)).astype(np.float32)
+            if frame is None or local_t >= CROSSFADE:
+                frame = scene
+            else:
+                alpha = local_t / CROSSFADE
+                frame = frame * (1 - alpha) + scene * alpha
+        frame = subtitle_band(frame.astype(np.uint8), seed=int(t // step))
+        proc.stdin.write(frame.tobytes())
+    proc.stdin.close()
+    if proc.wait():
+        raise RuntimeError(f"Reference render failed for {quality}")
+    return profile, width, height
+
+
+def encode(reference: str, output: str, encoder_name: str, profile, width, height, keyframes):
+    encoder = encoder_profiles.get_encoder_profile(encoder_name)
+    params = encoder_profiles.build_ffmpeg_params(encoder, profile, width, height, keyframe_times=keyframes)
+    cmd = [ffmpeg_binary(), "-y", "-loglevel", "error", "-i", reference, "-an",
+           "-c:v", "libx264", "-preset", profile["preset"], "-pix_fmt", "yuv420p"] + params + [output]
+    if encoder_profiles.ENCODER_THREADS:
+        cmd[-1:-1] = ["-threads", str(encoder_profiles.ENCODER_THREADS)]
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True)
+    return time.perf_counter() - start
+
+
+def ssim(encoded: str, reference: str) -> float:
+    proc = subprocess.run(
+        [ffmpeg_binary(), "-i", encoded, "-i", reference, "-lavfi", "[0:v][1:v]ssim", "-f", "null", "-"],
+        capture_output=True, text=True
+    )
+    match = re.search(r"All:([0-9.]+)", proc.stderr)
+    return float(match.group(1)) if match else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--qualities", default="standard,final")
+    parser.add_argument("--profiles", default=",".join(encoder_profiles.ENCODER_PROFILES))
+    parser.add_argument("--scenes", type=int, default=3)
+    parser.add_argument("--scene-seconds", type=float, default=4.0)
+    parser.add_argument("--json", help="write the result rows to this file")
+    args = parser.parse_args()
+
+    canvases = [synthetic_canvas(seed) for seed in range(args.scenes)]
+    keyframes = encoder_profiles.scene_boundaries([args.scene_seconds] * args.scenes, CROSSFADE)
+    rows = []
+
+    with tempfile.TemporaryDirectory(prefix="encoder_matrix_") as workdir:
+        for quality in args.qualities.split(","):
+            reference = os.path.join(workdir, f"reference_{quality}.mp4")
+            profile, width, height = render_reference(reference, canvases, quality, args.scene_seconds)
+
+            for encoder_name in args.profiles.split(","):
+                output = os.path.join(workdir, f"{quality}_{encoder_name}.mp4")
+                seconds = encode(reference, output, encoder_name, profile, width, height, keyframes)
+                rows.append({
+                    "quality": quality,
+                    "encoder": encoder_name,
+                    "resolution": f"{width}x{height}",
+                    "encode_seconds": round(seconds, 3),
+                    "size_kb": round(os.path.getsize(output) / 1024, 1),
+                    "ssim": round(ssim(output, reference), 5),
+                })
+                print(f"  {quality:>8} {encoder_name:<18} {seconds:7.2f}s {rows[-1]['size_kb']:9.1f} KB  SSIM {rows[-1]['ssim']:.5f}")
+
+    print("\n| quality | encoder | resolution | encode s | size KB | SSIM |")
+    print("|---|---|---|---|---|---|")
+    for row in rows:
+        print(f"| {row['quality']} | {row['encoder']} | {row['resolution']} | {row['encode_seconds']} | {row['size_kb']} | {row['ssim']} |")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
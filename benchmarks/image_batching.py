@@ -0,0 +1,124 @@
+"""
+Throughput vs. latency of cross-job image batching against a local fake batch server.
+
+The fake server behaves like a single-GPU diffusion server: it runs one batch at a
+time and a batch of n images takes OVERHEAD + n * PER_IMAGE seconds. Several
+simulated jobs each request a run of images back to back. The script compares
+one request per call (the current behaviour) with MicroBatcher at several
+batch-size/max-wait settings.
+
+Usage: python benchmarks/image_batching.py [--jobs 8] [--images-per-job 6]
+           [--overhead 0.2] [--per-image 0.03] [--configs 4:10,8:25,16:50]
+"""
+import io
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import threading
+import statistics
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import image_batcher  # noqa: E402
+
+
+def _tiny_png() -> str:
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), "grey").save(buf, "PNG")
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+def start_fake_server(overhead: float, per_image: float):
+    png = _tiny_png()
+    gpu = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            n = len(body["inputs"])
+            with gpu:
+                time.sleep(overhead + n * per_image)
+            data = json.dumps({"images": [png] * n}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+
+def run(jobs: int, images_per_job: int, request_one):
+    latencies, lock = [], threading.Lock()
+
+    def job(index):
+        for shot in range(images_per_job):
+            payload = {"inputs": f"job {index} shot {shot}", "parameters": {"seed": shot}}
+            start = time.perf_counter()
+            request_one(payload)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=job, args=(i,)) for i in range(jobs)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000, 1),
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--images-per-job", type=int, default=6)
+    parser.add_argument("--overhead", type=float, default=0.2, help="fixed seconds per server call")
+    parser.add_argument("--per-image", type=float, default=0.03, help="extra seconds per image in a call")
+    parser.add_argument("--configs", default="4:10,8:25,16:50", help="comma list of max_batch:max_wait_ms")
+    args = parser.parse_args()
+
+    server, url = start_fake_server(args.overhead, args.per_image)
+    backend = lambda payloads: image_batcher.post_batch(url, payloads, headers={})  # noqa: E731
+    rows = []
+
+    result = run(args.jobs, args.images_per_job, lambda payload: backend([payload]))
+    rows.append({"mode": "unbatched", "mean_batch": 1.0, **result})
+
+    for config in args.configs.split(","):
+        size, wait_ms = config.split(":")
+        batcher = image_batcher.MicroBatcher(backend, max_batch_size=int(size), max_wait_ms=float(wait_ms))
+        result = run(args.jobs, args.images_per_job, lambda payload: batcher.submit(payload).result())
+        sizes = list(batcher.batch_sizes)
+        batcher.close()
+        rows.append({"mode": f"batch {size} / {wait_ms} ms", "mean_batch": round(sum(sizes) / len(sizes), 2), **result})
+
+    server.shutdown()
+
+    print(f"jobs={args.jobs} images/job={args.images_per_job} server: {args.overhead}s + {args.per_image}s/image\n")
+    print("| mode | mean batch | images/s | p50 ms | p99 ms | wall s |")
+    print("|---|---|---|---|---|---|")
+    for row in rows:
+        print(f"| {row['mode']} | {row['mean_batch']} | {row['throughput']} | {row['p50_ms']} | {row['p99_ms']} | {row['wall_s']} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Startup benchmark for the pipeline package.
+
+Runs `python -X importtime` in a fresh interpreter for `import pipeline` and for
+each stage module, prints the slowest imports, and appends a record to
+benchmarks/import_time_history.jsonl so regressions show up over time.
+
+Usage: python benchmarks/import_time.py [--top 15] [--no-history]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_FILE = os.path.join(REPO_ROOT, "benchmarks", "import_time_history.jsonl")
+
+TARGETS = [
+    "pipeline",
+    "pipeline.module0_casting",
+    "pipeline.module1_screenwriting",
+    "pipeline.module2_voiceover",
+    "pipeline.module3_image_generation",
+    "pipeline.module4_postproduction",
+    "pipeline.main_pipeline",
+]
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$")
+
+
+def measure(target: str) -> Tuple[int, List[Tuple[int, int, str]], str]:
+    """
+    Imports `target` in a clean interpreter with -X importtime.
+    Returns (cumulative_us, [(self_us, cumulative_us, module), ...], error_text).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            entries.append((int(m.group(1)), int(m.group(2)), m.group(4).strip()))
+
+    total_us = 0
+    for _, cumulative, name in entries:
+        if name == target:
+            total_us = cumulative
+    error = "" if proc.returncode == 0 else proc.stderr.strip().splitlines()[-1]
+    return total_us, entries, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list per target")
+    parser.add_argument("--no-history", action="store_true", help="do not append to the history file")
+    args = parser.parse_args()
+
+    record: Dict[str, object] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "targets": {},
+    }
+
+    for target in TARGETS:
+        total_us, entries, error = measure(target)
+        record["targets"][target] = {"cumulative_ms": round(total_us / 1000, 2), "error": error or None}
+
+        print(f"\n=== import {target}: {total_us / 1000:.1f} ms ===")
+        if error:
+            print(f"  (import failed: {error})")
+        for self_us, cumulative, name in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+            print(f"  {cumulative / 1000:9.1f} ms cumulative  {self_us / 1000:8.1f} ms self  {name}")
+
+    if not args.no_history:
+        with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"\nAppended results to {HISTORY_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,52 @@
 # __init__.py
-from .module0_casting import *
-from .module1_screenwriting import *
-from .module2_voiceover import *
-from .module3_image_generation import *
-from .module4_postproduction import *
-from .main_pipeline import create_story_video
+# Stage modules are imported on first attribute access so that `import pipeline`
+# does not pull in provider SDKs or moviepy.
+import importlib
+
+_LAZY_EXPORTS = {
+    "create_story_video": "main_pipeline",
+    "stream_story_video": "main_pipeline",
+    "create_story_video_async": "main_pipeline",
+    "enrich_prompt": "module0_casting",
+    "enrich_prompt_async": "module0_casting",
+    "CONTEXT_KEYWORDS": "module0_casting",
+    "CREATURE_KEYWORDS": "module0_casting",
+    "generate_story_text": "module1_screenwriting",
+    "generate_scene_list_from_story": "module1_screenwriting",
+    "generate_story_text_async": "module1_screenwriting",
+    "generate_scene_list_from_story_async": "module1_screenwriting",
+    "extract_json_from_response": "module1_screenwriting",
+    "extract_text_from_response": "module1_screenwriting",
+    "generate_audio": "module2_voiceover",
+    "generate_audio_async": "module2_voiceover",
+    "generate_image": "module3_image_generation",
+    "generate_image_async": "module3_image_generation",
+    "API_URL": "module3_image_generation",
+    "get_endpoint_stats": "image_scheduler",
+    "normalize_image": "image_store",
+    "load_canvas": "image_store",
+    "create_scene_clip": "module4_postproduction",
+    "assemble_video": "module4_postproduction",
+    "get_render_profile": "render_profiles",
+    "get_render": "render_queue",
+    "StoryProject": "story_project",
+    "create_story_project": "story_project",
+    "load_story_project": "story_project",
+    "summarize_jobs": "job_metrics",
+    "recent_jobs": "job_metrics",
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,56 @@
+import os
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+# --- Shared plumbing for the async pipeline ---
+# Per-process backpressure: each kind of outbound call has its own concurrency cap,
+# and whole stories are admitted through the "story" cap, so one worker can keep
+# many stories in their network-bound phases without flooding any provider.
+# CPU-bound work (moviepy, PIL, numpy) runs on a bounded thread pool.
+STAGE_LIMITS: Dict[str, int] = {
+    "story": int(os.environ.get("CHITRAKATHA_MAX_STORIES", 32)),
+    "llm": int(os.environ.get("CHITRAKATHA_MAX_LLM_CALLS", 16)),
+    "tts": int(os.environ.get("CHITRAKATHA_MAX_TTS_CALLS", 8)),
+    "image": int(os.environ.get("CHITRAKATHA_MAX_IMAGE_CALLS", 16)),
+    "render": int(os.environ.get("CHITRAKATHA_MAX_RENDERS", 2)),
+}
+CPU_WORKERS = int(os.environ.get("CHITRAKATHA_CPU_WORKERS", os.cpu_count() or 2))
+
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+_cpu_executor: Optional[ThreadPoolExecutor] = None
+
+
+def limit(kind: str) -> asyncio.Semaphore:
+    """
+    Semaphore capping concurrent `kind` operations in this process (one set per event loop).
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        semaphores = _semaphores.setdefault(loop, {})
+        if kind not in semaphores:
+            semaphores[kind] = asyncio.Semaphore(STAGE_LIMITS.get(kind, 8))
+        return semaphores[kind]
+
+
+def _get_cpu_executor() -> ThreadPoolExecutor:
+    global _cpu_executor
+    with _lock:
+        if _cpu_executor is None:
+            _cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="pipeline-cpu")
+        return _cpu_executor
+
+
+async def run_cpu(func, *args, **kwargs):
+    """
+    Runs a blocking / CPU-bound call on the shared executor without blocking the loop
+    (in a copy of the caller's context, so job_metrics accounting follows the call).
+    """
+    from pipeline import job_metrics
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_cpu_executor(), functools.partial(job_metrics.bind(func), *args, **kwargs))
@@ -0,0 +1,205 @@
+import os
+import wave
+import subprocess
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# --- Narration track assembly ---
+# Each scene's narration is decoded exactly once (ffmpeg resamples everything to one
+# rate/layout, including the 24 kHz silent fallbacks) and laid down as one continuous
+# buffer under all of the scene's shots; loudness matching, crossfades between scenes
+# and the final fade-out are applied to whole NumPy buffers in one pass.
+# The finished WAV is muxed next to the encoded video instead of going through
+# moviepy's chunked audio callbacks.
+SAMPLE_RATE = 44100
+CHANNELS = 2
+TARGET_RMS_DBFS = -20.0
+PEAK_CEILING_DBFS = -1.0
+SILENCE_GATE_DBFS = -50.0
+
+
+def _ffmpeg_binary() -> str:
+    from moviepy.config import get_setting
+    return get_setting("FFMPEG_BINARY")
+
+
+def decode_audio(path: str, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> np.ndarray:
+    """
+    Decodes a whole file to float32 PCM of shape (samples, channels) at `sample_rate`.
+    """
+    from pipeline import clip_resources
+
+    cmd = [_ffmpeg_binary(), "-v", "error", "-i", path, "-f", "f32le", "-acodec", "pcm_f32le",
+           "-ac", str(channels), "-ar", str(sample_rate), "-"]
+    with clip_resources.reader_slot():
+        proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        raise IOError(f"ffmpeg could not decode {path}: {proc.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(proc.stdout, dtype=np.float32).reshape(-1, channels)
+
+
+def _gated_rms(samples: np.ndarray, sample_rate: int) -> Optional[float]:
+    """
+    RMS over 50 ms blocks louder than the silence gate (None if everything is silent).
+    """
+    block = max(1, int(sample_rate * 0.05))
+    usable = len(samples) - len(samples) % block
+    if usable == 0:
+        return None
+    power = np.mean(np.square(samples[:usable].reshape(-1, block * samples.shape[1])), axis=1)
+    gate = 10 ** (SILENCE_GATE_DBFS / 10)
+    loud = power[power > gate]
+    if loud.size == 0:
+        return None
+    return float(np.sqrt(np.mean(loud)))
+
+
+def loudness_gain(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> float:
+    """
+    Linear gain that brings the gated RMS to TARGET_RMS_DBFS without pushing peaks
+    above PEAK_CEILING_DBFS. Silent buffers get unity gain.
+    """
+    rms = _gated_rms(samples, sample_rate)
+    if rms is None:
+        return 1.0
+    gain = 10 ** (TARGET_RMS_DBFS / 20) / rms
+    peak = float(np.max(np.abs(samples)))
+    if peak > 0:
+        gain = min(gain, 10 ** (PEAK_CEILING_DBFS / 20) / peak)
+    return gain
+
+
+def shot_spans(duration: float, shot_count: int, crossfade_duration: float = 0.0) -> List[Tuple[float, float]]:
+    """
+    Splits one scene's narration of `duration` seconds across `shot_count` crossfaded
+    shots, as (start, end) seconds per shot. Every shot but the last runs on for
+    `crossfade_duration` into the next one's part, so after the video overlaps the
+    shots still cover exactly `duration` and the narration plays through unbroken.
+    """
+    part = duration / shot_count
+    return [(j * part, min(duration, (j + 1) * part + (crossfade_duration if j < shot_count - 1 else 0.0)))
+            for j in range(shot_count)]
+
+
+def build_narration_track(audio_paths: List[str], durations: List[float], crossfade_duration: float = 0.5,
+                          groups: List = None, total_duration: float = None, fade_in: float = 0.0,
+                          fade_out: float = None, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Builds the narration for clips concatenated with crossfades (clip i starts at
+    sum(durations[:i]) - i * crossfade_duration). Consecutive clips with the same file
+    and `groups` key (the shots of one scene, see shot_spans) share one continuous
+    narration, decoded once; different narrations get equal-power crossfades over the
+    overlaps. The track fades in over `fade_in` and out over `fade_out` seconds
+    (default: `crossfade_duration`), matching the video's own fades. Narrations
+    sharing a `groups` key get one common loudness gain. `total_duration` trims/pads
+    the track to the video's length before the fades. Returns float32 PCM of shape
+    (samples, CHANNELS).
+    """
+    if len(audio_paths) != len(durations):
+        raise ValueError("audio_paths and durations must have the same length.")
+    groups = groups if groups is not None else list(range(len(audio_paths)))
+
+    # Merge the shots of each narration into one run: [path, group, duration on the timeline]
+    runs = []
+    for path, duration, group in zip(audio_paths, durations, groups):
+        if runs and runs[-1][0] == path and runs[-1][1] == group:
+            runs[-1][2] += duration - crossfade_duration
+        else:
+            runs.append([path, group, duration])
+    groups = [group for _, group, _ in runs]
+
+    decoded = {}
+    segments = []
+    for path, _, duration in runs:
+        if path not in decoded:
+            decoded[path] = decode_audio(path, sample_rate)
+        samples = decoded[path]
+        length = int(round(duration * sample_rate))
+        if len(samples) < length:
+            samples = np.pad(samples, ((0, length - len(samples)), (0, 0)))
+        segments.append(samples[:length])
+
+    # One gain per group, measured on the group's concatenated audio
+    gains = {}
+    for key in dict.fromkeys(groups):
+        members = [seg for seg, g in zip(segments, groups) if g == key]
+        gains[key] = loudness_gain(np.concatenate(members), sample_rate)
+
+    overlap = int(round(crossfade_duration * sample_rate))
+    starts = np.cumsum([0] + [len(seg) - overlap for seg in segments[:-1]])
+    track = np.zeros((starts[-1] + len(segments[-1]), CHANNELS), dtype=np.float32)
+
+    ramp = np.linspace(0.0, 1.0, overlap, dtype=np.float32)[:, None] if overlap else None
+    rise = np.sin(ramp * np.pi / 2) if overlap else None
+    fall = np.cos(ramp * np.pi / 2) if overlap else None
+
+    last = len(segments) - 1
+    for i, (seg, start) in enumerate(zip(segments, starts)):
+        seg = seg * np.float32(gains[groups[i]])
+        if overlap and len(seg) >= overlap:
+            if i > 0:
+                seg[:overlap] *= rise
+            if i < last:
+                seg[-overlap:] *= fall
+        track[start:start + len(seg)] += seg
+
+    if total_duration is not None:
+        length = int(round(total_duration * sample_rate))
+        track = track[:length] if len(track) >= length else np.pad(track, ((0, length - len(track)), (0, 0)))
+
+    head = min(int(round(fade_in * sample_rate)), len(track))
+    if head:
+        track[:head] *= np.linspace(0.0, 1.0, head, dtype=np.float32)[:, None]
+    tail = min(int(round((crossfade_duration if fade_out is None else fade_out) * sample_rate)), len(track))
+    if tail:
+        track[-tail:] *= np.linspace(1.0, 0.0, tail, dtype=np.float32)[:, None]
+
+    return np.clip(track, -1.0, 1.0)
+
+
+def write_wav(samples: np.ndarray, filename: str, sample_rate: int = SAMPLE_RATE) -> str:
+    """
+    Writes float PCM as 16-bit WAV.
+    """
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(filename, "wb") as f:
+        f.setnchannels(pcm.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    return filename
+
+
+def mux(video_path: str, audio_path: str, output_filename: str, audio_bitrate: str = "192k") -> str:
+    """
+    Copies the encoded video stream and encodes the finished narration to AAC in one
+    ffmpeg pass.
+    """
+    return _run_mux(["-i", video_path], audio_path, output_filename, audio_bitrate)
+
+
+def concat_mux(video_paths: List[str], audio_path: str, output_filename: str, audio_bitrate: str = "192k") -> str:
+    """
+    Like mux, but joins several video-only segments (same encoder settings) with the
+    concat demuxer, so the video streams are copied rather than re-encoded.
+    """
+    list_path = os.path.splitext(output_filename)[0] + "-segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in video_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        return _run_mux(["-f", "concat", "-safe", "0", "-i", list_path], audio_path, output_filename, audio_bitrate)
+    finally:
+        os.remove(list_path)
+
+
+def _run_mux(video_input: List[str], audio_path: str, output_filename: str, audio_bitrate: str) -> str:
+    cmd = [_ffmpeg_binary(), "-y", "-v", "error"] + video_input + ["-i", audio_path,
+           "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-c:a", "aac", "-b:a", audio_bitrate,
+           "-shortest", "-movflags", "+faststart", output_filename]
+    proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        raise IOError(f"ffmpeg mux failed for {output_filename}: {proc.stderr.decode(errors='ignore').strip()}")
+    return output_filename
@@ -0,0 +1,97 @@
+import os
+import threading
+from contextlib import contextmanager
+
+# --- Bounded ffmpeg reader lifecycle ---
+# Every AudioFileClip owns an ffmpeg subprocess plus its pipes. Readers are opened
+# only while they are actually being read, and a process-wide semaphore caps how
+# many can be alive at once across all concurrent jobs.
+MAX_FFMPEG_READERS = int(os.environ.get("CHITRAKATHA_MAX_FFMPEG_READERS", max(4, os.cpu_count() or 1)))
+_reader_slots = threading.BoundedSemaphore(MAX_FFMPEG_READERS)
+
+
+@contextmanager
+def reader_slot():
+    """
+    Holds one of the process-wide ffmpeg reader slots for the duration of the block.
+    """
+    _reader_slots.acquire()
+    try:
+        yield
+    finally:
+        _reader_slots.release()
+
+
+def probe_duration(filename: str) -> float:
+    """
+    Reads a media file's duration with a short-lived ffprobe-style call (no reader is kept).
+    """
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+    with reader_slot():
+        infos = ffmpeg_parse_infos(filename)
+    return infos["duration"]
+
+
+def lazy_audio_file_clip(filename: str, duration: float = None, fps: int = 44100, nchannels: int = 2):
+    """
+    Returns an AudioClip for `filename` that does not start ffmpeg until its first
+    frame is requested, and stops it as soon as the last frame has been read (or on
+    close()). Copies made by moviepy (set_start, fx, ...) share the same reader.
+    """
+    from moviepy.editor import AudioClip, AudioFileClip
+    import numpy as np
+
+    if duration is None:
+        duration = probe_duration(filename)
+
+    # Shared mutable state so moviepy's shallow copies all see the same reader
+    state = {"reader": None, "lock": threading.Lock()}
+
+    def release():
+        with state["lock"]:
+            reader = state["reader"]
+            state["reader"] = None
+        if reader is not None:
+            reader.close()
+            _reader_slots.release()
+
+    def make_frame(t):
+        with state["lock"]:
+            if state["reader"] is None:
+                _reader_slots.acquire()
+                try:
+                    state["reader"] = AudioFileClip(filename, fps=fps, nbytes=2)
+                except Exception:
+                    _reader_slots.release()
+                    raise
+            frame = state["reader"].get_frame(t)
+
+        # Audio is rendered in time order, so once the tail has been read the
+        # reader will not be needed again (a later request simply reopens it).
+        if np.max(t) >= duration - 1.0 / fps:
+            release()
+        return frame
+
+    # Passing make_frame to AudioClip() would probe frame 0 and open the reader early
+    clip = AudioClip(duration=duration, fps=fps)
+    clip.make_frame = make_frame
+    clip.nchannels = nchannels
+    clip.filename = filename
+    clip.close = release
+    return clip
+
+
+def close_clips(clips: list):
+    """
+    Deterministically releases every clip and its audio (safe to call more than once).
+    """
+    for clip in clips:
+        audio = getattr(clip, "audio", None)
+        for resource in (audio, clip):
+            if resource is None:
+                continue
+            try:
+                resource.close()
+            except Exception as e:
+                print(f"[Clip Resources] Failed to close {resource!r}: {e}")
@@ -0,0 +1,178 @@
+import io
+import os
+import time
+import base64
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from queue import Queue, Empty
+from collections import deque
+from typing import List, Dict, Any, Optional
+
+import requests
+from PIL import Image
+
+from pipeline import providers, job_metrics
+
+# --- Cross-job micro-batching for batch-capable image servers ---
+# Shots from every story in this process are queued here. A dispatcher thread
+# waits at most MAX_WAIT_MS after the first pending request, collects up to
+# MAX_BATCH_SIZE requests and sends them as one call; each caller's Future is
+# resolved with its own image.
+#
+# Backend contract (self-hosted diffusers/TGI-style server, or a local stand-in):
+#   POST {"inputs": [prompt, ...], "parameters": [params, ...]}
+#   ->   {"images": [<base64 PNG>, ...]}   (same order and length as inputs)
+BATCH_ENDPOINT_URL = os.environ.get("CHITRAKATHA_IMAGE_BATCH_URL")
+MAX_BATCH_SIZE = int(os.environ.get("CHITRAKATHA_IMAGE_BATCH_SIZE", 8))
+MAX_WAIT_MS = float(os.environ.get("CHITRAKATHA_IMAGE_BATCH_WAIT_MS", 50))
+MAX_INFLIGHT_BATCHES = int(os.environ.get("CHITRAKATHA_IMAGE_BATCH_INFLIGHT", 2))
+BATCH_TIMEOUT = 300
+
+
+class ImageBatchError(requests.exceptions.RequestException):
+    """Raised (per caller) when a batch call fails or returns the wrong number of images."""
+
+
+def post_batch(url: str, payloads: List[Dict[str, Any]], timeout: float = BATCH_TIMEOUT,
+               headers: Dict[str, str] = None) -> List[Image.Image]:
+    """
+    Sends one batch call and decodes the returned images, in request order.
+    `headers` defaults to the Hugging Face auth headers.
+    """
+    body = {
+        "inputs": [p["inputs"] for p in payloads],
+        "parameters": [p.get("parameters", {}) for p in payloads],
+    }
+    headers = providers.get_hf_headers() if headers is None else headers
+    response = requests.post(url, headers=headers, json=body, timeout=timeout)
+    response.raise_for_status()
+    encoded = response.json().get("images", [])
+    if len(encoded) != len(payloads):
+        raise ImageBatchError(f"Batch returned {len(encoded)} images for {len(payloads)} requests.")
+
+    images = []
+    for data in encoded:
+        raw = base64.b64decode(data)
+        image = Image.open(io.BytesIO(raw))
+        image.load()
+        image.info["download_bytes"] = len(raw)
+        images.append(image)
+    return images
+
+
+class MicroBatcher:
+    """
+    Coalesces submit() calls from any thread into batches for `backend(payloads)`.
+    """
+
+    def __init__(self, backend, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS,
+                 max_inflight: int = MAX_INFLIGHT_BATCHES):
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue: "Queue[tuple]" = Queue()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_inflight), thread_name_prefix="image-batch")
+        self.inflight = threading.BoundedSemaphore(max(1, max_inflight))
+        self.batch_sizes = deque(maxlen=1000)  # recent batch sizes, for monitoring
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._run, name="image-batcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, payload: Dict[str, Any]) -> Future:
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed.")
+        future: Future = Future()
+        self.queue.put((payload, future, time.monotonic()))
+        return future
+
+    def close(self):
+        self._closed = True
+        self.queue.put(None)
+        self._dispatcher.join()
+        self.executor.shutdown(wait=True)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            # Backpressure: while every batch slot is busy, requests keep piling up in
+            # the queue and all join the next batch
+            self.inflight.acquire()
+
+            batch = [item]
+            deadline = item[2] + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except Empty:
+                    break
+                if item is None:
+                    stop = True  # finish this batch, then exit
+                    break
+                batch.append(item)
+
+            self.batch_sizes.append(len(batch))
+            self.executor.submit(self._dispatch, batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch):
+        try:
+            results = self.backend([payload for payload, _, _ in batch])
+            for (_, future, _), image in zip(batch, results):
+                # A caller may have given up (timeout/cancel) while the batch was running
+                if not future.done():
+                    future.set_result(image)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e if isinstance(e, requests.exceptions.RequestException) else ImageBatchError(str(e)))
+        finally:
+            self.inflight.release()
+
+
+_batcher: Optional[MicroBatcher] = None
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(BATCH_ENDPOINT_URL)
+
+
+def get_batcher() -> MicroBatcher:
+    """
+    Process-wide batcher for BATCH_ENDPOINT_URL, created on first use.
+    """
+    global _batcher
+    with _lock:
+        if _batcher is None:
+            _batcher = MicroBatcher(lambda payloads: post_batch(BATCH_ENDPOINT_URL, payloads))
+        return _batcher
+
+
+def request_image(payload: Dict[str, Any], timeout: float = BATCH_TIMEOUT) -> Image.Image:
+    """
+    Queues one image request for the next batch and waits for its image.
+    """
+    job_metrics.add("image_requests")
+    try:
+        return get_batcher().submit(payload).result(timeout=timeout)
+    except FutureTimeoutError:
+        raise ImageBatchError(f"No image from the batch endpoint within {timeout}s.")
+
+
+async def request_image_async(payload: Dict[str, Any], timeout: float = BATCH_TIMEOUT) -> Image.Image:
+    """
+    Async variant of request_image: awaits the batch Future without blocking the loop.
+    """
+    import asyncio
+
+    job_metrics.add("image_requests")
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(get_batcher().submit(payload)), timeout)
+    except asyncio.TimeoutError:
+        raise ImageBatchError(f"No image from the batch endpoint within {timeout}s.")
@@ -0,0 +1,356 @@
+import io
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional
+
+import requests
+from PIL import Image
+
+from pipeline import providers, job_metrics
+
+# --- Hedged, latency-aware image requests ---
+# Endpoints are interchangeable FLUX deployments, in order of preference. Each
+# attempt goes to the fastest healthy endpoint; if it has not answered by the
+# HEDGE_PERCENTILE of that endpoint's observed latency, a duplicate request is
+# sent to the next endpoint (or the same one) and whichever image arrives first wins.
+# Hedges are capped by a budget (HEDGE_BUDGET per request sent) and skipped while
+# the request pool has a backlog, so they never add load when the pool is saturated.
+IMAGE_ENDPOINTS: List[Dict[str, Any]] = [
+    {"name": "hf-inference", "url": "https://api-inference.huggingface.co/models/black-forest-labs/FLUX.1-schnell", "timeout": 180},
+    {"name": "hf-router", "url": "https://router.huggingface.co/hf-inference/models/black-forest-labs/FLUX.1-schnell", "timeout": 180},
+]
+# Comma-separated URLs replace the list above (e.g. a self-hosted FLUX server first)
+if os.environ.get("CHITRAKATHA_IMAGE_ENDPOINTS"):
+    IMAGE_ENDPOINTS = [
+        {"name": f"endpoint-{i}", "url": url.strip(), "timeout": 180}
+        for i, url in enumerate(os.environ["CHITRAKATHA_IMAGE_ENDPOINTS"].split(",")) if url.strip()
+    ]
+
+HEDGE_PERCENTILE = float(os.environ.get("CHITRAKATHA_HEDGE_PERCENTILE", 0.9))
+HEDGE_DEFAULT_DELAY = 20.0   # seconds, until an endpoint has MIN_SAMPLES observations
+HEDGE_MIN_DELAY = 2.0
+HEDGE_BUDGET = float(os.environ.get("CHITRAKATHA_HEDGE_BUDGET", 0.1))  # hedges per request, over time
+HEDGE_BUDGET_BURST = 5.0
+MIN_SAMPLES = 5
+DECAY_EVERY = 32  # successes; the histogram is then halved so recent latency dominates
+FAILURES_BEFORE_COOLDOWN = 2
+COOLDOWN_SECONDS = 60.0
+
+# Log-spaced latency buckets from 0.25 s to ~256 s (upper bounds)
+_BUCKETS = [0.25 * 2 ** (i / 2) for i in range(21)]
+
+
+class ImageRequestError(requests.exceptions.RequestException):
+    """Raised when every racing request of an attempt failed."""
+
+
+class EndpointStats:
+    """
+    Decaying latency histogram and health state for one endpoint. Every DECAY_EVERY
+    successes all counts are halved, so an endpoint that slows down (without
+    failing) loses its rank within a few dozen requests.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts = [0.0] * (len(_BUCKETS) + 1)
+        self.samples = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.lock = threading.Lock()
+
+    def record_success(self, seconds: float):
+        index = next((i for i, bound in enumerate(_BUCKETS) if seconds <= bound), len(_BUCKETS))
+        with self.lock:
+            self.counts[index] += 1
+            self.samples += 1
+            if self.samples % DECAY_EVERY == 0:
+                self.counts = [count / 2 for count in self.counts]
+            self.consecutive_failures = 0
+            self.cooldown_until = 0.0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= FAILURES_BEFORE_COOLDOWN:
+                self.cooldown_until = time.monotonic() + COOLDOWN_SECONDS
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Upper bound of the bucket containing the p-th latency quantile (None without data).
+        """
+        with self.lock:
+            total = sum(self.counts)
+            if total == 0:
+                return None
+            rank = max(p * total, 1e-9)
+            seen = 0.0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return _BUCKETS[min(index, len(_BUCKETS) - 1)]
+        return _BUCKETS[-1]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "failures": self.failures,
+            "healthy": self.healthy(),
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+        }
+
+
+_stats: Dict[str, EndpointStats] = {}
+_stats_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_queued = 0  # requests submitted to the pool that have not started yet
+_hedge_tokens = 0.0
+
+
+def _get_stats(endpoint: Dict[str, Any]) -> EndpointStats:
+    with _stats_lock:
+        if endpoint["name"] not in _stats:
+            _stats[endpoint["name"]] = EndpointStats(endpoint["name"])
+        return _stats[endpoint["name"]]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _stats_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(os.environ.get("CHITRAKATHA_IMAGE_WORKERS", 16)),
+                                           thread_name_prefix="image")
+        return _executor
+
+
+def rank_endpoints(endpoints: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Healthy endpoints first, then by median latency; endpoints without enough data
+    rank as fast so they get measured. Ties keep the configured order.
+    """
+    endpoints = endpoints or IMAGE_ENDPOINTS
+
+    def key(item):
+        index, endpoint = item
+        stats = _get_stats(endpoint)
+        median = stats.percentile(0.5) if stats.samples >= MIN_SAMPLES else 0.0
+        return (not stats.healthy(), median, index)
+
+    return [endpoint for _, endpoint in sorted(enumerate(endpoints), key=key)]
+
+
+def _credit_hedge_budget():
+    global _hedge_tokens
+    with _stats_lock:
+        _hedge_tokens = min(HEDGE_BUDGET_BURST, _hedge_tokens + HEDGE_BUDGET)
+
+
+def _take_hedge_token() -> bool:
+    """
+    Spends one hedge from the budget; False if it is used up (or the pool is backed up).
+    """
+    global _hedge_tokens
+    with _stats_lock:
+        if _queued > 0 or _hedge_tokens < 1.0:
+            return False
+        _hedge_tokens -= 1.0
+        return True
+
+
+def hedge_delay(endpoint: Dict[str, Any]) -> float:
+    stats = _get_stats(endpoint)
+    observed = stats.percentile(HEDGE_PERCENTILE) if stats.samples >= MIN_SAMPLES else None
+    delay = observed if observed is not None else HEDGE_DEFAULT_DELAY
+    return min(max(delay, HEDGE_MIN_DELAY), endpoint.get("timeout", 180))
+
+
+def _decode_image(content: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(content))
+    image.load()
+    image.info["download_bytes"] = len(content)
+    return image
+
+
+def _request_image(endpoint: Dict[str, Any], payload: Dict[str, Any]) -> Image.Image:
+    stats = _get_stats(endpoint)
+    start = time.monotonic()
+    try:
+        response = requests.post(endpoint["url"], headers=providers.get_hf_headers(), json=payload,
+                                 timeout=endpoint.get("timeout", 180))
+        response.raise_for_status()
+        image = _decode_image(response.content)
+    except Exception:
+        stats.record_failure()
+        raise
+    stats.record_success(time.monotonic() - start)
+    return image
+
+
+def _submit(endpoint: Dict[str, Any], payload: Dict[str, Any], sent_at: List[float]):
+    """
+    Queues _request_image on the pool; `sent_at` gets the time the request actually
+    starts, so waiting in the queue never counts as endpoint latency.
+    """
+    global _queued
+    executor = _get_executor()
+    with _stats_lock:
+        _queued += 1
+
+    def send():
+        global _queued
+        with _stats_lock:
+            _queued -= 1
+        sent_at.append(time.monotonic())
+        return _request_image(endpoint, payload)
+
+    return executor.submit(send)
+
+
+def request_image(payload: Dict[str, Any], endpoints: List[Dict[str, Any]] = None, hedge: bool = True) -> Image.Image:
+    """
+    Runs one (possibly hedged) attempt and returns the first image that arrives.
+    Raises ImageRequestError if every request sent in this attempt failed.
+    Every request sent (hedges and failovers included) counts as an image request
+    of the current job.
+    """
+    ranked = rank_endpoints(endpoints)
+    primary = ranked[0]
+    delay = hedge_delay(primary)
+
+    job_metrics.add("image_requests")
+    _credit_hedge_budget()
+    primary_sent: List[float] = []
+    pending = {_submit(primary, payload, primary_sent): primary["name"]}
+    errors = []
+    backup_sent = False
+
+    while pending:
+        timeout = None
+        if hedge and not backup_sent:
+            # The hedge timer runs from when the primary was sent, not from when it was queued
+            timeout = max(0.0, delay - (time.monotonic() - primary_sent[0])) if primary_sent else delay
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        if not done:
+            if not primary_sent or time.monotonic() - primary_sent[0] < delay:
+                continue  # still queued: the timer has not (fully) run yet
+            if not _take_hedge_token():
+                print(f"[Image Scheduler] {primary['name']} exceeded p{int(HEDGE_PERCENTILE * 100)}; "
+                      "not hedging (hedge budget used up or request pool backed up).")
+                hedge = False
+                continue
+            # Primary is slower than its usual tail: race a duplicate request
+            backup = ranked[1] if len(ranked) > 1 else primary
+            print(f"[Image Scheduler] {primary['name']} exceeded p{int(HEDGE_PERCENTILE * 100)} "
+                  f"({delay:.1f}s); hedging on {backup['name']}.")
+            job_metrics.add("image_requests")
+            pending[_submit(backup, payload, [])] = backup["name"]
+            backup_sent = True
+            continue
+
+        for future in done:
+            name = pending.pop(future)
+            try:
+                return future.result()
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+
+        # The only request so far failed: fail over right away instead of waiting
+        if not pending and not backup_sent and len(ranked) > 1:
+            backup = ranked[1]
+            print(f"[Image Scheduler] {primary['name']} failed; failing over to {backup['name']}.")
+            job_metrics.add("image_requests")
+            pending[_submit(backup, payload, [])] = backup["name"]
+            backup_sent = True
+
+    raise ImageRequestError("; ".join(errors))
+
+
+async def _request_image_async(endpoint: Dict[str, Any], payload: Dict[str, Any]) -> Image.Image:
+    from pipeline import async_runtime
+
+    stats = _get_stats(endpoint)
+    start = time.monotonic()
+    try:
+        client = providers.get_async_http_client()
+        response = await client.post(endpoint["url"], headers=providers.get_hf_headers(), json=payload,
+                                     timeout=endpoint.get("timeout", 180))
+        response.raise_for_status()
+        # PNG decoding is CPU-bound: keep it off the event loop
+        image = await async_runtime.run_cpu(_decode_image, response.content)
+    except Exception:
+        stats.record_failure()
+        raise
+    stats.record_success(time.monotonic() - start)
+    return image
+
+
+async def request_image_async(payload: Dict[str, Any], endpoints: List[Dict[str, Any]] = None, hedge: bool = True) -> Image.Image:
+    """
+    Async variant of request_image. The losing request is cancelled as soon as an
+    image arrives, which frees its connection.
+    """
+    import asyncio
+
+    ranked = rank_endpoints(endpoints)
+    primary = ranked[0]
+
+    job_metrics.add("image_requests")
+    _credit_hedge_budget()
+    pending = {asyncio.ensure_future(_request_image_async(primary, payload)): primary["name"]}
+    errors = []
+    backup_sent = False
+
+    try:
+        while pending:
+            timeout = hedge_delay(primary) if hedge and not backup_sent else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                if not _take_hedge_token():
+                    print(f"[Image Scheduler] {primary['name']} exceeded p{int(HEDGE_PERCENTILE * 100)}; "
+                          "not hedging (hedge budget used up).")
+                    hedge = False
+                    continue
+                backup = ranked[1] if len(ranked) > 1 else primary
+                print(f"[Image Scheduler] {primary['name']} exceeded p{int(HEDGE_PERCENTILE * 100)} "
+                      f"({timeout:.1f}s); hedging on {backup['name']}.")
+                job_metrics.add("image_requests")
+                pending[asyncio.ensure_future(_request_image_async(backup, payload))] = backup["name"]
+                backup_sent = True
+                continue
+
+            for task in done:
+                name = pending.pop(task)
+                try:
+                    return task.result()
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+
+            if not pending and not backup_sent and len(ranked) > 1:
+                backup = ranked[1]
+                print(f"[Image Scheduler] {primary['name']} failed; failing over to {backup['name']}.")
+                job_metrics.add("image_requests")
+                pending[asyncio.ensure_future(_request_image_async(backup, payload))] = backup["name"]
+                backup_sent = True
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise ImageRequestError("; ".join(errors))
+
+
+def get_endpoint_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Latency percentiles and health per endpoint, for logging or a status page.
+    """
+    return {endpoint["name"]: _get_stats(endpoint).summary() for endpoint in IMAGE_ENDPOINTS}
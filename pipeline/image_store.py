@@ -0,0 +1,88 @@
+import os
+from typing import Tuple
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+# --- Canonical working canvas for post-production ---
+# Every generated image is converted once into a 16:9 RGB canvas at the target
+# resolution and stored as a raw .npy array. Render code (in this or another
+# process) memory-maps the canvas instead of decoding and resizing the PNG again.
+CANVAS_SIZE: Tuple[int, int] = (1920, 1080)  # (width, height)
+CANVAS_SUFFIX = ".canvas.npy"
+
+
+def _fit_canvas(image: Image.Image, size: Tuple[int, int], mode: str) -> Image.Image:
+    target_w, target_h = size
+    src_w, src_h = image.size
+
+    if mode == "crop":
+        # Fill the whole canvas, cropping the overflow around the centre.
+        scale = max(target_w / src_w, target_h / src_h)
+        resized = image.resize((round(src_w * scale), round(src_h * scale)), Image.LANCZOS)
+        left = (resized.width - target_w) // 2
+        top = (resized.height - target_h) // 2
+        return resized.crop((left, top, left + target_w, top + target_h))
+
+    if mode == "pad":
+        # Fit the whole image, filling the side bars with a blurred cover of itself.
+        cover_scale = max(target_w / src_w, target_h / src_h)
+        background = image.resize((round(src_w * cover_scale), round(src_h * cover_scale)), Image.BILINEAR)
+        left = (background.width - target_w) // 2
+        top = (background.height - target_h) // 2
+        background = background.crop((left, top, left + target_w, top + target_h))
+        background = background.filter(ImageFilter.GaussianBlur(radius=40))
+
+        fit_scale = min(target_w / src_w, target_h / src_h)
+        foreground = image.resize((round(src_w * fit_scale), round(src_h * fit_scale)), Image.LANCZOS)
+        background.paste(foreground, ((target_w - foreground.width) // 2, (target_h - foreground.height) // 2))
+        return background
+
+    raise ValueError(f"Unknown canvas mode: {mode!r}. Use 'pad' or 'crop'.")
+
+
+def canvas_path_for(image_path: str) -> str:
+    return os.path.splitext(image_path)[0] + CANVAS_SUFFIX
+
+
+def normalize_image(image_path: str, canvas_path: str = None, size: Tuple[int, int] = CANVAS_SIZE, mode: str = "pad") -> str:
+    """
+    Converts a generated image into the canonical working canvas and stores it as a
+    memory-mappable (height, width, 3) uint8 array. Returns the canvas path.
+    """
+    canvas_path = canvas_path or canvas_path_for(image_path)
+
+    with Image.open(image_path) as image:
+        canvas = _fit_canvas(image.convert("RGB"), size, mode)
+
+    width, height = size
+    stored = np.lib.format.open_memmap(canvas_path, mode="w+", dtype=np.uint8, shape=(height, width, 3))
+    stored[:] = np.asarray(canvas, dtype=np.uint8)
+    stored.flush()
+    del stored
+
+    print(f"[Image Store] Canvas saved: {canvas_path} ({width}x{height}, {mode})")
+    return canvas_path
+
+
+def load_canvas(canvas_path: str) -> np.ndarray:
+    """
+    Memory-maps a stored canvas read-only; pages are shared between processes.
+    """
+    return np.load(canvas_path, mmap_mode="r")
+
+
+def open_canvas(path: str, size: Tuple[int, int] = CANVAS_SIZE, mode: str = "pad") -> np.ndarray:
+    """
+    Returns a canvas for `path`: memory-mapped if it is a stored canvas (or one exists
+    next to the image), otherwise normalized in memory without touching disk.
+    """
+    if path.endswith(CANVAS_SUFFIX):
+        return load_canvas(path)
+
+    stored = canvas_path_for(path)
+    if os.path.exists(stored):
+        return load_canvas(stored)
+
+    with Image.open(path) as image:
+        return np.asarray(_fit_canvas(image.convert("RGB"), size, mode), dtype=np.uint8)
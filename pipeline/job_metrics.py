@@ -0,0 +1,371 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+# --- Per-job resource accounting ---
+# The running job lives in a context variable, so every stage records into it
+# without extra arguments: asyncio tasks inherit it, and the pipeline's executors
+# (async_runtime.run_cpu, render_queue) run work in a copy of the caller's context.
+# Finished jobs are written to a local SQLite store for capacity planning; set
+# CHITRAKATHA_METRICS_DB to "" to keep metrics in memory only.
+METRICS_DB = os.environ.get("CHITRAKATHA_METRICS_DB", os.path.join("output", "job_metrics.sqlite3"))
+RSS_SAMPLE_INTERVAL = 0.05  # seconds
+CHARS_PER_TOKEN = 4.0       # estimate when a response carries no usage metadata
+
+COUNTERS = (
+    "tts_calls", "tts_characters", "tts_retries", "tts_fallbacks",
+    "image_calls", "image_requests", "image_retries", "image_placeholders",
+    "bytes_downloaded", "cache_hits", "cache_misses",
+)
+
+_current_job: contextvars.ContextVar = contextvars.ContextVar("chitrakatha_job", default=None)
+_db_lock = threading.Lock()
+
+
+class JobMetrics:
+    """
+    Resource and cost counters for one job. Safe to update from several threads.
+    """
+
+    def __init__(self, kind: str, **labels):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.labels = labels
+        self.status = "running"
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.llm_calls: List[Dict[str, Any]] = []
+        self.sections: Dict[str, Dict[str, float]] = {}
+        self.cache_savings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_llm(self, stage: str, model: str, prompt_tokens: int, output_tokens: int, seconds: float, estimated: bool):
+        with self._lock:
+            self.llm_calls.append({
+                "stage": stage, "model": model, "prompt_tokens": prompt_tokens, "output_tokens": output_tokens,
+                "seconds": round(seconds, 3), "estimated": estimated,
+            })
+
+    def record_section(self, name: str, cpu_seconds: float, child_cpu_seconds: float, wall_seconds: float,
+                       peak_rss_mb: Optional[float]):
+        with self._lock:
+            section = self.sections.setdefault(name, {"count": 0, "cpu_seconds": 0.0, "child_cpu_seconds": 0.0,
+                                                      "wall_seconds": 0.0, "peak_rss_mb": None})
+            section["count"] += 1
+            section["cpu_seconds"] += cpu_seconds
+            section["child_cpu_seconds"] += child_cpu_seconds
+            section["wall_seconds"] += wall_seconds
+            if peak_rss_mb is not None:
+                section["peak_rss_mb"] = max(section["peak_rss_mb"] or 0.0, peak_rss_mb)
+
+    def record_cache_hit(self, saved: Dict[str, float] = None):
+        """A reused asset; `saved` is what building it cost (see totals())."""
+        with self._lock:
+            self.counters["cache_hits"] += 1
+            for name, amount in (saved or {}).items():
+                self.cache_savings[name] = self.cache_savings.get(name, 0) + amount
+
+    def totals(self) -> Dict[str, float]:
+        """
+        Flat cost totals: the counters plus LLM tokens and CPU seconds.
+        """
+        with self._lock:
+            totals = {name: value for name, value in self.counters.items() if name not in ("cache_hits", "cache_misses")}
+            totals["llm_calls"] = len(self.llm_calls)
+            totals["llm_prompt_tokens"] = sum(call["prompt_tokens"] for call in self.llm_calls)
+            totals["llm_output_tokens"] = sum(call["output_tokens"] for call in self.llm_calls)
+            totals["cpu_seconds"] = round(sum(s["cpu_seconds"] + s["child_cpu_seconds"] for s in self.sections.values()), 3)
+        return totals
+
+    def summary(self) -> Dict[str, Any]:
+        totals = self.totals()
+        with self._lock:
+            peaks = [s["peak_rss_mb"] for s in self.sections.values() if s["peak_rss_mb"] is not None]
+            return {
+                "job_id": self.job_id,
+                "kind": self.kind,
+                "status": self.status,
+                "labels": dict(self.labels),
+                "started_at": self.started_at,
+                "wall_seconds": round((self.finished_at or time.time()) - self.started_at, 3),
+                "totals": totals,
+                "peak_rss_mb": max(peaks) if peaks else None,
+                "cache": {
+                    "hits": self.counters["cache_hits"],
+                    "misses": self.counters["cache_misses"],
+                    "saved": {name: round(amount, 3) for name, amount in self.cache_savings.items()},
+                },
+                "llm_calls": [dict(call) for call in self.llm_calls],
+                "sections": {name: {k: (round(v, 3) if isinstance(v, float) else v) for k, v in s.items()}
+                             for name, s in self.sections.items()},
+            }
+
+
+def current() -> Optional[JobMetrics]:
+    return _current_job.get()
+
+
+@contextmanager
+def track_job(kind: str, **labels):
+    """
+    Runs the block as a job and stores its metrics when the block exits. Inside an
+    already tracked job the outer job is reused, so nested entry points count once.
+    """
+    job = _current_job.get()
+    if job is not None:
+        yield job
+        return
+
+    job = JobMetrics(kind, **labels)
+    token = _current_job.set(job)
+    try:
+        yield job
+        if job.status == "running":
+            job.status = "ok"
+    except BaseException:
+        job.status = "error"
+        raise
+    finally:
+        _current_job.reset(token)
+        job.finished_at = time.time()
+        save_job(job)
+
+
+def bind(func):
+    """
+    Wraps `func` to run in a copy of the caller's current context (i.e. inside the
+    current job), for handing one call to an executor thread.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+# --- Recording helpers (no-ops outside a job) ---
+def add(name: str, amount: float = 1):
+    job = _current_job.get()
+    if job is not None:
+        job.add(name, amount)
+
+
+def record_cache_hit(saved: Dict[str, float] = None):
+    job = _current_job.get()
+    if job is not None:
+        job.record_cache_hit(saved)
+
+
+def cost_since(before: Dict[str, float]) -> Dict[str, float]:
+    """
+    What the current job spent since `before` (a totals() snapshot), non-zero entries only.
+    """
+    job = _current_job.get()
+    if job is None:
+        return {}
+    after = job.totals()
+    return {name: round(after[name] - before.get(name, 0), 3) for name in after if after[name] != before.get(name, 0)}
+
+
+def snapshot() -> Dict[str, float]:
+    job = _current_job.get()
+    return job.totals() if job is not None else {}
+
+
+def record_llm(stage: str, model: str, response, prompt: str, seconds: float):
+    """
+    Records one LLM call from the response's usage metadata, or an estimate from the
+    prompt/response length when the response has none.
+    """
+    job = _current_job.get()
+    if job is None:
+        return
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    output_tokens = getattr(usage, "candidates_token_count", None)
+    estimated = prompt_tokens is None or output_tokens is None
+    if estimated:
+        try:
+            output_text = response.text or ""
+        except Exception:
+            output_text = ""
+        prompt_tokens = int(len(prompt) / CHARS_PER_TOKEN) if prompt_tokens is None else prompt_tokens
+        output_tokens = int(len(output_text) / CHARS_PER_TOKEN) if output_tokens is None else output_tokens
+    job.record_llm(stage, model, int(prompt_tokens), int(output_tokens), seconds, estimated)
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return None
+        # Lifetime high-water mark (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if peak > 2 ** 32 else peak / 2 ** 10
+
+
+def _children_cpu_seconds() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextmanager
+def measure(section: str):
+    """
+    Records CPU seconds, wall time and peak RSS of the block under `section`.
+    CPU is this thread's time plus finished child processes (ffmpeg); the child time
+    and the RSS samples are process-wide, so they are approximate while several jobs
+    render at once.
+    """
+    job = _current_job.get()
+    if job is None:
+        yield
+        return
+
+    peak = [_rss_mb()]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(RSS_SAMPLE_INTERVAL):
+            rss = _rss_mb()
+            if rss is not None:
+                peak[0] = max(peak[0] or 0.0, rss)
+
+    sampler = threading.Thread(target=sample, name="rss-sampler", daemon=True)
+    sampler.start()
+    wall_start, cpu_start, child_start = time.perf_counter(), time.thread_time(), _children_cpu_seconds()
+    try:
+        yield
+    finally:
+        cpu_seconds = time.thread_time() - cpu_start
+        child_cpu_seconds = _children_cpu_seconds() - child_start
+        wall_seconds = time.perf_counter() - wall_start
+        done.set()
+        sampler.join()
+        rss = _rss_mb()
+        if rss is not None:
+            peak[0] = max(peak[0] or 0.0, rss)
+        job.record_section(section, cpu_seconds, child_cpu_seconds, wall_seconds,
+                           round(peak[0], 1) if peak[0] is not None else None)
+
+
+# --- Local store ---
+_JOB_COLUMNS = (
+    "job_id", "kind", "status", "started_at", "finished_at", "wall_seconds",
+    "prompt", "language", "tone", "quality",
+    "llm_calls", "llm_prompt_tokens", "llm_output_tokens",
+) + COUNTERS + ("cpu_seconds", "peak_rss_mb", "summary")
+GROUP_COLUMNS = ("kind", "status", "language", "tone", "quality", "prompt", "day")
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, kind TEXT, status TEXT, started_at REAL, "
+        "finished_at REAL, wall_seconds REAL, prompt TEXT, language TEXT, tone TEXT, quality TEXT, "
+        "llm_calls INTEGER, llm_prompt_tokens INTEGER, llm_output_tokens INTEGER, "
+        + ", ".join(f"{name} REAL" for name in COUNTERS)
+        + ", cpu_seconds REAL, peak_rss_mb REAL, summary TEXT)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS llm_calls (job_id TEXT, stage TEXT, model TEXT, prompt_tokens INTEGER, "
+        "output_tokens INTEGER, seconds REAL, estimated INTEGER)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS llm_calls_job ON llm_calls (job_id)")
+    return conn
+
+
+@contextmanager
+def _database(db_path: str):
+    with _db_lock:
+        conn = _connect(db_path)
+        try:
+            with conn:  # commits, or rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+
+def save_job(job: JobMetrics, db_path: str = None):
+    """
+    Inserts or updates the job's row (a background render may add to a job later).
+    Store errors are reported but never fail the job.
+    """
+    db_path = METRICS_DB if db_path is None else db_path
+    if not db_path:
+        return
+    summary = job.summary()
+    totals = summary["totals"]
+    row = {
+        "job_id": job.job_id, "kind": job.kind, "status": job.status, "started_at": job.started_at,
+        "finished_at": job.finished_at, "wall_seconds": summary["wall_seconds"],
+        "prompt": job.labels.get("prompt"), "language": job.labels.get("language"),
+        "tone": job.labels.get("tone"), "quality": job.labels.get("quality"),
+        "cache_hits": summary["cache"]["hits"], "cache_misses": summary["cache"]["misses"],
+        "peak_rss_mb": summary["peak_rss_mb"], "summary": json.dumps(summary),
+    }
+    row.update({name: value for name, value in totals.items() if name in _JOB_COLUMNS and name not in row})
+    try:
+        with _database(db_path) as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(_JOB_COLUMNS)}) VALUES ({', '.join('?' * len(_JOB_COLUMNS))})",
+                [row.get(name) for name in _JOB_COLUMNS]
+            )
+            conn.execute("DELETE FROM llm_calls WHERE job_id = ?", (job.job_id,))
+            conn.executemany(
+                "INSERT INTO llm_calls VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(job.job_id, c["stage"], c["model"], c["prompt_tokens"], c["output_tokens"], c["seconds"], int(c["estimated"]))
+                 for c in summary["llm_calls"]]
+            )
+    except sqlite3.Error as e:
+        print(f"[Job Metrics] Could not store job {job.job_id}: {e}")
+
+
+def summarize_jobs(group_by: str = "kind", since: float = None, db_path: str = None) -> List[Dict[str, Any]]:
+    """
+    Per-group job counts, totals and averages from the store, most expensive (LLM
+    tokens) first. `group_by` is one of GROUP_COLUMNS ("day" groups by start date);
+    `since` is a Unix timestamp.
+    """
+    if group_by not in GROUP_COLUMNS:
+        raise ValueError(f"Unknown group_by '{group_by}'. Choose from: {', '.join(GROUP_COLUMNS)}")
+    key = "date(started_at, 'unixepoch')" if group_by == "day" else group_by
+    sums = ["llm_calls", "llm_prompt_tokens", "llm_output_tokens", "tts_characters", "image_requests",
+            "image_retries", "bytes_downloaded", "cpu_seconds", "cache_hits"]
+    query = (
+        f"SELECT {key} AS {group_by}, COUNT(*) AS jobs, "
+        + ", ".join(f"SUM({name}) AS {name}" for name in sums)
+        + ", AVG(wall_seconds) AS avg_wall_seconds, AVG(cpu_seconds) AS avg_cpu_seconds, MAX(peak_rss_mb) AS peak_rss_mb "
+        f"FROM jobs WHERE started_at >= ? GROUP BY {key} ORDER BY SUM(llm_prompt_tokens) + SUM(llm_output_tokens) DESC"
+    )
+    with _database(db_path or METRICS_DB) as conn:
+        return [dict(row) for row in conn.execute(query, (since or 0,))]
+
+
+def recent_jobs(limit: int = 20, db_path: str = None) -> List[Dict[str, Any]]:
+    """
+    The latest jobs' full summaries, newest first.
+    """
+    with _database(db_path or METRICS_DB) as conn:
+        rows = conn.execute("SELECT summary FROM jobs ORDER BY started_at DESC LIMIT ?", (limit,))
+        return [json.loads(row["summary"]) for row in rows]
@@ -2,21 +2,57 @@ import os
 import time
 import uuid
 import shutil
-from moviepy.editor import AudioFileClip
+import asyncio
 
 from pipeline import (
     module0_casting, 
     module1_screenwriting, 
     module2_voiceover, 
     module3_image_generation, 
-    module4_postproduction
+    image_store,
+    render_profiles,
+    render_queue,
+    async_runtime,
+    job_metrics
 )
 
-def create_story_video(prompt: str, language: str = "English", tone: str = "Default"):
+
+def _render_outputs(render_scenes, project_name: str, temp_folder: str, quality: str, background_final: bool):
+    """
+    Renders the assembled scenes at `quality`, then queues the final render or cleans
+    up the temp files. Returns (video_path, profile_name).
+    """
+    profile_name = render_profiles.get_render_profile(quality)["name"]
+    final_video_path = os.path.join(project_name, "final_story.mp4")
+    video_path = final_video_path if profile_name == "final" else os.path.join(project_name, f"{profile_name}_story.mp4")
+    render_queue.render_story(render_scenes, video_path, quality=profile_name)
+
+    if background_final and profile_name != "final":
+        render_queue.submit_render(render_scenes, final_video_path, quality="final", cleanup_folder=temp_folder)
+    else:
+        shutil.rmtree(temp_folder)
+    return video_path, profile_name
+
+def create_story_video(prompt: str, language: str = "English", tone: str = "Default",
+                       quality: str = "final", background_final: bool = False, with_metrics: bool = False):
     """
     Main pipeline for generating an AI animated story with audio, images, and video.
-    Returns the path to the final video and the full story text.
+    Returns the path to the rendered video and the full story text.
+
+    `quality` selects the render profile (draft, standard, final). With
+    `background_final=True` a lower-quality render is returned immediately and the
+    1080p render is queued from the same assets (see render_queue.get_render).
+    With `with_metrics=True` the job's cost and resource summary (job_metrics) is
+    returned as a third value; every job is also recorded in the metrics store.
     """
+    with job_metrics.track_job("story", prompt=prompt, language=language, tone=tone, quality=quality) as job:
+        video_path, story_text = _create_story_video(prompt, language, tone, quality, background_final)
+        if video_path is None:
+            job.status = "failed"
+    return (video_path, story_text, job.summary()) if with_metrics else (video_path, story_text)
+
+
+def _create_story_video(prompt: str, language: str, tone: str, quality: str, background_final: bool):
     print("\n--- Starting New Story Generation ---")
     pipeline_start = time.time()
 
@@ -41,7 +77,7 @@ def create_story_video(prompt: str, language: str = "English", tone: str = "Defa
     if not scene_list:
         return None, "Failed to generate story content. Please try a different prompt."
 
-    video_clips = []
+    render_scenes = []
     full_story_text = " ".join([scene.get("sentence", "") for scene in scene_list])
 
     # --- Step 3: Loop Through Scenes ---
@@ -70,49 +106,167 @@ def create_story_video(prompt: str, language: str = "English", tone: str = "Defa
         if isinstance(shot, str):
             shot = [shot]
 
-        with AudioFileClip(audio_path) as main_audio_clip:
-            audio_duration = main_audio_clip.duration
-            duration_per_shot = audio_duration / len(shot)
-
-            for j, visual_prompt in enumerate(shot):
-                shot_path_base = os.path.join(temp_folder, f"scene_{i+1:02d}_shot_{j+1:02d}")
-                image_path = f"{shot_path_base}.png"
-                sub_audio_path = f"{shot_path_base}.mp3"
-
-                # --- Generate Image ---
-                module3_image_generation.generate_image(
-                    shot_type=shot_type,
-                    visual_prompt=visual_prompt,
-                    updated_cast=updated_cast,
-                    filename=image_path
-                )
-                temp_image_files.append(image_path)
-
-                # --- Split Audio ---
-                sub_audio_clip = main_audio_clip.subclip(j * duration_per_shot, (j + 1) * duration_per_shot)
-                sub_audio_clip.write_audiofile(sub_audio_path, logger=None)
-                temp_audio_files.append(sub_audio_path)
-
-                # --- Create Scene Clip ---
-                final_audio_clip = AudioFileClip(sub_audio_path)
-                scene_clip = module4_postproduction.create_scene_clip(
-                    image_path=image_path,
-                    audio_clip=final_audio_clip,
-                    subtitle_text=sentence
-                )
-                video_clips.append(scene_clip)
-
-    if not video_clips:
-        return None, "Video generation failed. No valid scenes created."
+        # --- Each shot plays its part of the scene audio (split at render time) ---
+        shot_path_bases = [os.path.join(temp_folder, f"scene_{i+1:02d}_shot_{j+1:02d}") for j in range(len(shot))]
 
-    # --- Step 4: Assemble Final Video ---
-    final_video_path = os.path.join(project_name, "final_story.mp4")
-    module4_postproduction.assemble_video(video_clips, output_filename=final_video_path)
+        for j, (visual_prompt, shot_path_base) in enumerate(zip(shot, shot_path_bases)):
+            image_path = f"{shot_path_base}.png"
+
+            # --- Generate Image ---
+            module3_image_generation.generate_image(
+                shot_type=shot_type,
+                visual_prompt=visual_prompt,
+                updated_cast=updated_cast,
+                filename=image_path
+            )
+            temp_image_files.append(image_path)
 
-    # --- Optional: Clean up temp files ---
-    shutil.rmtree(temp_folder)
+            # --- Normalize to the 16:9 working canvas (once per image) ---
+            canvas_path = image_store.normalize_image(image_path)
+            temp_image_files.append(canvas_path)
+
+            # --- Record Scene Assets (clips are built at render time) ---
+            render_scenes.append({
+                "image_path": canvas_path,
+                "audio_path": audio_path,
+                "audio_part": [j, len(shot)],
+                "subtitle_text": sentence,
+                "scene_index": i
+            })
+
+    if not render_scenes:
+        return None, "Video generation failed. No valid scenes created."
+
+    # --- Step 4: Assemble Video, then queue the final render or clean up temp files ---
+    video_path, profile_name = _render_outputs(render_scenes, project_name, temp_folder, quality, background_final)
 
     pipeline_end = time.time()
-    print(f"\n[Main] Pipeline complete in {(pipeline_end - pipeline_start)/60:.2f} minutes.")
+    print(f"\n[Main] Pipeline complete ({profile_name}) in {(pipeline_end - pipeline_start)/60:.2f} minutes.")
+
+    return video_path, full_story_text
+
+
+def stream_story_video(prompt: str, language: str = "English", tone: str = "Default", quality: str = "draft"):
+    """
+    Generator for the Gradio API: yields (video_path, story_text) for the quick render
+    first, then again with the final 1080p video once its background render is done.
+    """
+    video_path, story_text = create_story_video(prompt, language, tone, quality=quality, background_final=True)
+    yield video_path, story_text
+
+    if video_path is None:
+        return
+    final_video_path = os.path.join(os.path.dirname(video_path), "final_story.mp4")
+    future = render_queue.get_render(final_video_path)
+    if future is None:
+        # Not queued (already final quality) or already finished by now
+        if final_video_path != video_path and os.path.exists(final_video_path):
+            yield final_video_path, story_text
+        return
+    try:
+        yield future.result(), story_text
+    except Exception as e:
+        print(f"[Main] Final render failed, keeping the {quality} video: {e}")
+
+
+async def _process_scene_async(i: int, scene_data, scene_count: int, temp_folder: str, language: str, tone: str):
+    """
+    Async counterpart of one iteration of create_story_video's scene loop: the
+    narration is generated first, then every shot's image is generated concurrently.
+    Returns the scene's render entries (empty if the scene is skipped).
+    """
+    sentence = scene_data.get("sentence")
+    updated_cast = scene_data.get("characters", [])
+    shot = scene_data.get("shot", [])
+    shot_type = scene_data.get("shot_type", [])
+
+    if not sentence or not shot or not updated_cast:
+        print(f"Scene {i+1} missing critical data. Skipping.")
+        return []
+
+    print(f"\n--- Processing Scene {i+1}/{scene_count}: {sentence} ---")
+
+    audio_path = os.path.join(temp_folder, f"scene_{i+1:02d}.mp3")
+    audio_success = await module2_voiceover.generate_audio_async(
+        text=sentence, lang=language, filename=audio_path, story_tone=tone
+    )
+    if not audio_success:
+        print("Audio generation failed. Skipping scene.")
+        return []
+
+    if isinstance(shot, str):
+        shot = [shot]
+    shot_path_bases = [os.path.join(temp_folder, f"scene_{i+1:02d}_shot_{j+1:02d}") for j in range(len(shot))]
+
+    async def make_canvas(visual_prompt: str, shot_path_base: str) -> str:
+        image_path = f"{shot_path_base}.png"
+        await module3_image_generation.generate_image_async(
+            shot_type=shot_type,
+            visual_prompt=visual_prompt,
+            updated_cast=updated_cast,
+            filename=image_path
+        )
+        return await async_runtime.run_cpu(image_store.normalize_image, image_path)
+
+    canvas_paths = await asyncio.gather(*(make_canvas(p, base) for p, base in zip(shot, shot_path_bases)))
+
+    return [
+        {"image_path": canvas_path, "audio_path": audio_path, "audio_part": [j, len(shot)], "subtitle_text": sentence,
+         "scene_index": i}
+        for j, canvas_path in enumerate(canvas_paths)
+    ]
+
+
+async def create_story_video_async(prompt: str, language: str = "English", tone: str = "Default",
+                                   quality: str = "final", background_final: bool = False, with_metrics: bool = False):
+    """
+    Async counterpart of create_story_video, for serving many stories from one event
+    loop. LLM, TTS and image calls use non-blocking clients; moviepy/PIL/ffmpeg work
+    runs on async_runtime's executor. Stories, provider calls and renders are each
+    capped per process (see async_runtime.STAGE_LIMITS).
+    """
+    with job_metrics.track_job("story", prompt=prompt, language=language, tone=tone, quality=quality) as job:
+        video_path, story_text = await _create_story_video_async(prompt, language, tone, quality, background_final)
+        if video_path is None:
+            job.status = "failed"
+    return (video_path, story_text, job.summary()) if with_metrics else (video_path, story_text)
+
+
+async def _create_story_video_async(prompt: str, language: str, tone: str, quality: str, background_final: bool):
+    async with async_runtime.limit("story"):
+        print("\n--- Starting New Story Generation (async) ---")
+        pipeline_start = time.time()
+
+        request_id = uuid.uuid4().hex[:8]
+        project_name = f"generated_story_{request_id}"
+        temp_folder = os.path.join(project_name, "temp")
+        os.makedirs(temp_folder, exist_ok=True)
+
+        rich_concept, cast_list = await module0_casting.enrich_prompt_async(simple_prompt=prompt, story_tone=tone)
+        story_text = await module1_screenwriting.generate_story_text_async(rich_concept, cast_list)
+        scene_list = await module1_screenwriting.generate_scene_list_from_story_async(story_text, cast_list, rich_concept)
+
+        if not scene_list:
+            return None, "Failed to generate story content. Please try a different prompt."
+
+        full_story_text = " ".join([scene.get("sentence", "") for scene in scene_list])
+
+        # Scenes run concurrently; gather keeps them in story order
+        scene_entries = await asyncio.gather(*(
+            _process_scene_async(i, scene_data, len(scene_list), temp_folder, language, tone)
+            for i, scene_data in enumerate(scene_list)
+        ))
+        render_scenes = [entry for entries in scene_entries for entry in entries]
+
+        if not render_scenes:
+            return None, "Video generation failed. No valid scenes created."
+
+        async with async_runtime.limit("render"):
+            video_path, profile_name = await async_runtime.run_cpu(
+                _render_outputs, render_scenes, project_name, temp_folder, quality, background_final
+            )
+
+        pipeline_end = time.time()
+        print(f"\n[Main] Pipeline complete ({profile_name}) in {(pipeline_end - pipeline_start)/60:.2f} minutes.")
 
-    return final_video_path, full_story_text
+        return video_path, full_story_text
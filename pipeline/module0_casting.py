@@ -1,15 +1,11 @@
 import re
 import json
+import time
 import random
 from typing import Dict, List, Tuple, Any, Optional
-from dotenv import load_dotenv
-import google.generativeai as genai
-from pipeline.config import GOOGLE_API_KEY, ELEVEN_API_KEY, HF_API_TOKEN
+from pipeline import providers, job_metrics
 
-
-
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel('gemini-2.5-flash')
+MODEL_NAME = "gemini-2.5-flash"
 
 
 CONTEXT_KEYWORDS: Dict[str, List[str]] = {
@@ -66,9 +62,9 @@ def _detect_context(text: str, keyword_map: Dict[str, List[str]]) -> Optional[st
             best, best_hits = context, hits
     return best
 
-def enrich_prompt(simple_prompt: str, story_tone: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]]]:
+def _build_enrich_prompt(simple_prompt: str, story_tone: Optional[str] = None) -> Tuple[str, Optional[str]]:
     """
-    Generates a rich concept and a stable cast_list with immutable visual_anchors.
+    Returns the casting prompt and the detected factual context (if any).
     """
     context = _detect_context(simple_prompt, CONTEXT_KEYWORDS)
 
@@ -108,13 +104,10 @@ def enrich_prompt(simple_prompt: str, story_tone: Optional[str] = None) -> Tuple
         f"Do NOT include mood or temporary states in anchors.\n"
         f"Return ONLY raw JSON (no markdown)."
     )
+    return prompt, context
 
-    print("[Module 0] Requesting Gemini to enrich prompt and create cast list...")
-    response = model.generate_content(
-        prompt,
-        generation_config={"response_mime_type": "application/json"}
-    )
-    
+
+def _parse_enrich_response(response, simple_prompt: str, context: Optional[str]) -> Tuple[str, List[Dict[str, Any]]]:
     try:
         raw_parts = []
         if response.candidates:
@@ -155,4 +148,41 @@ def enrich_prompt(simple_prompt: str, story_tone: Optional[str] = None) -> Tuple
             "seed": random.randint(10000, 99999),
             "source_context": context
         }]
-        return fallback_concept, fallback_cast
\ No newline at end of file
+        return fallback_concept, fallback_cast
+
+
+def enrich_prompt(simple_prompt: str, story_tone: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Generates a rich concept and a stable cast_list with immutable visual_anchors.
+    """
+    prompt, context = _build_enrich_prompt(simple_prompt, story_tone)
+
+    print("[Module 0] Requesting Gemini to enrich prompt and create cast list...")
+    model = providers.get_gemini_model(MODEL_NAME)
+    start = time.perf_counter()
+    response = model.generate_content(
+        prompt,
+        generation_config={"response_mime_type": "application/json"}
+    )
+    job_metrics.record_llm("enrich_prompt", MODEL_NAME, response, prompt, time.perf_counter() - start)
+    return _parse_enrich_response(response, simple_prompt, context)
+
+
+async def enrich_prompt_async(simple_prompt: str, story_tone: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Async counterpart of enrich_prompt (non-blocking Gemini call).
+    """
+    from pipeline import async_runtime
+
+    prompt, context = _build_enrich_prompt(simple_prompt, story_tone)
+
+    print("[Module 0] Requesting Gemini to enrich prompt and create cast list...")
+    model = providers.get_gemini_model(MODEL_NAME)
+    async with async_runtime.limit("llm"):
+        start = time.perf_counter()
+        response = await model.generate_content_async(
+            prompt,
+            generation_config={"response_mime_type": "application/json"}
+        )
+    job_metrics.record_llm("enrich_prompt", MODEL_NAME, response, prompt, time.perf_counter() - start)
+    return _parse_enrich_response(response, simple_prompt, context)
\ No newline at end of file
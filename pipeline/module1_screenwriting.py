@@ -1,14 +1,13 @@
 import os
 import re
 import json
-from typing import List, Dict, Any
-import google.generativeai as genai
+import time
+from typing import List, Dict, Any, Optional
 
-from pipeline.config import GOOGLE_API_KEY, ELEVEN_API_KEY, HF_API_TOKEN
+from pipeline import providers, job_metrics
 
 # --- Environment Setup ---
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel("gemini-2.5-pro")
+MODEL_NAME = "gemini-2.5-pro"
 
 
 def _find_first_json_substring(text: str) -> Optional[str]:
@@ -140,7 +139,7 @@ def extract_text_from_response(response) -> Optional[str]:
     return None
 
 
-def generate_story_text(rich_concept: str, cast_list: List[Dict[str, Any]]) -> str:
+def _build_story_prompt(rich_concept: str, cast_list: List[Dict[str, Any]]) -> str:
     source_context = cast_list[0].get("source_context") if cast_list else None
     FACTUAL_MODE = bool(source_context)
     mode_intro = (f"STRICT FACTUAL MODE for {source_context}: The story MUST adhere to widely accepted accounts/canon. "
@@ -158,14 +157,10 @@ def generate_story_text(rich_concept: str, cast_list: List[Dict[str, Any]]) -> s
         f"- Total scenes: 6 to 8 (inclusive).\n\n"
         f"Return ONLY the story text as a single, clean paragraph, with no title or extra formatting."
     )
+    return prompt
 
-    print("[Module 1 - Step A] Requesting story paragraph...")
-    try:
-        response = model.generate_content(prompt, generation_config={"response_mime_type": "text/plain"})
-    except Exception as e:
-        print(f"[Module 1 - Step A] model.generate_content raised: {e}. Returning fallback short paragraph.")
-        return f"{rich_concept}. A short fallback story."
 
+def _clean_story_text(response) -> str:
     story_text = extract_text_from_response(response) or ""
     # sanitize into a single paragraph: collapse newlines and repeated spaces
     story_text = re.sub(r"\s+", " ", story_text).strip()
@@ -174,6 +169,44 @@ def generate_story_text(rich_concept: str, cast_list: List[Dict[str, Any]]) -> s
     return story_text
 
 
+def generate_story_text(rich_concept: str, cast_list: List[Dict[str, Any]]) -> str:
+    prompt = _build_story_prompt(rich_concept, cast_list)
+
+    print("[Module 1 - Step A] Requesting story paragraph...")
+    try:
+        model = providers.get_gemini_model(MODEL_NAME)
+        start = time.perf_counter()
+        response = model.generate_content(prompt, generation_config={"response_mime_type": "text/plain"})
+        job_metrics.record_llm("story_text", MODEL_NAME, response, prompt, time.perf_counter() - start)
+    except Exception as e:
+        print(f"[Module 1 - Step A] model.generate_content raised: {e}. Returning fallback short paragraph.")
+        return f"{rich_concept}. A short fallback story."
+
+    return _clean_story_text(response)
+
+
+async def generate_story_text_async(rich_concept: str, cast_list: List[Dict[str, Any]]) -> str:
+    """
+    Async counterpart of generate_story_text.
+    """
+    from pipeline import async_runtime
+
+    prompt = _build_story_prompt(rich_concept, cast_list)
+
+    print("[Module 1 - Step A] Requesting story paragraph...")
+    try:
+        model = providers.get_gemini_model(MODEL_NAME)
+        async with async_runtime.limit("llm"):
+            start = time.perf_counter()
+            response = await model.generate_content_async(prompt, generation_config={"response_mime_type": "text/plain"})
+        job_metrics.record_llm("story_text", MODEL_NAME, response, prompt, time.perf_counter() - start)
+    except Exception as e:
+        print(f"[Module 1 - Step A] model.generate_content_async raised: {e}. Returning fallback short paragraph.")
+        return f"{rich_concept}. A short fallback story."
+
+    return _clean_story_text(response)
+
+
 def _rotate_shot_type(prev: Optional[str]) -> str:
     order = ["Wide Angle Shot", "Medium Shot", "Close up Shot"]
     if prev is None:
@@ -184,11 +217,7 @@ def _rotate_shot_type(prev: Optional[str]) -> str:
     return "Medium Shot"
 
 
-def generate_scene_list_from_story(story_text: str, cast_list: List[Dict[str, Any]], rich_concept: str) -> List[Dict[str, Any]]:
-    """
-    Convert the clean story paragraph into scene_list JSON following the scene schema.
-    Returns: list of scene dicts (or fallback minimal scenes on parse failure).
-    """
+def _build_scene_list_prompt(story_text: str, cast_list: List[Dict[str, Any]]) -> str:
     character_names = ", ".join([char.get("name", "a character") for char in cast_list])
     source_context = cast_list[0].get("source_context") if cast_list else None
     FACTUAL_MODE = bool(source_context)
@@ -235,13 +264,10 @@ def generate_scene_list_from_story(story_text: str, cast_list: List[Dict[str, An
         f"5. 'shot_type': one of: Wide Angle Shot, Medium Shot, Close up Shot. Start with a Wide Angle shot for context and do NOT repeat the same shot_type consecutively.\n\n"
         f"Return ONLY the valid JSON object; NOTHING else. Example:\n{example_json}\n"
     )
+    return prompt
 
-    print("[Module 1 - Step B] Requesting scene_list JSON...")
-    try:
-        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-    except Exception as e:
-        print(f"[Module 1 - Step B] model.generate_content raised: {e}. Falling back.")
-        response = None
+
+def _parse_scene_list_response(response, cast_list: List[Dict[str, Any]], rich_concept: str) -> List[Dict[str, Any]]:
 
     # # debug dump
     # try:
@@ -333,3 +359,45 @@ def generate_scene_list_from_story(story_text: str, cast_list: List[Dict[str, An
                 "shot_type": "Wide Angle Shot"
             })
         return fallback_scenes
+
+
+def generate_scene_list_from_story(story_text: str, cast_list: List[Dict[str, Any]], rich_concept: str) -> List[Dict[str, Any]]:
+    """
+    Convert the clean story paragraph into scene_list JSON following the scene schema.
+    Returns: list of scene dicts (or fallback minimal scenes on parse failure).
+    """
+    prompt = _build_scene_list_prompt(story_text, cast_list)
+
+    print("[Module 1 - Step B] Requesting scene_list JSON...")
+    try:
+        model = providers.get_gemini_model(MODEL_NAME)
+        start = time.perf_counter()
+        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        job_metrics.record_llm("scene_list", MODEL_NAME, response, prompt, time.perf_counter() - start)
+    except Exception as e:
+        print(f"[Module 1 - Step B] model.generate_content raised: {e}. Falling back.")
+        response = None
+
+    return _parse_scene_list_response(response, cast_list, rich_concept)
+
+
+async def generate_scene_list_from_story_async(story_text: str, cast_list: List[Dict[str, Any]], rich_concept: str) -> List[Dict[str, Any]]:
+    """
+    Async counterpart of generate_scene_list_from_story.
+    """
+    from pipeline import async_runtime
+
+    prompt = _build_scene_list_prompt(story_text, cast_list)
+
+    print("[Module 1 - Step B] Requesting scene_list JSON...")
+    try:
+        model = providers.get_gemini_model(MODEL_NAME)
+        async with async_runtime.limit("llm"):
+            start = time.perf_counter()
+            response = await model.generate_content_async(prompt, generation_config={"response_mime_type": "application/json"})
+        job_metrics.record_llm("scene_list", MODEL_NAME, response, prompt, time.perf_counter() - start)
+    except Exception as e:
+        print(f"[Module 1 - Step B] model.generate_content_async raised: {e}. Falling back.")
+        response = None
+
+    return _parse_scene_list_response(response, cast_list, rich_concept)
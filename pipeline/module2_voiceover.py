@@ -1,69 +1,109 @@
 import os
 import time
-from elevenlabs.client import ElevenLabs
-from translate import Translator
-import numpy as np
-import soundfile as sf
-from pipeline.config import GOOGLE_API_KEY, ELEVEN_API_KEY, HF_API_TOKEN
+from pipeline import providers, job_metrics
 
-genai.configure(api_key=GOOGLE_API_KEY)
-gemini_model = genai.GenerativeModel('gemini-2.5-flash')
-client = ElevenLabs(api_key=ELEVEN_API_KEY)
+TRANSLATION_MODEL_NAME = "gemini-2.5-flash"
 
-def generate_audio(text: str, lang: str, filename: str, story_tone: str = None):
-    """
-    Generates narration audio in the user's chosen language.
-    Returns True on success and False on failure.
-    """
-    # --- Step 1: Prepare narration text in the selected language ---
-    print(f"Preparing narration in language: {lang}")
-    narration_text = text # Default to English
-    if lang.lower() != "english":
-        print(f"Translating the Story to {lang}..")
-        prompt = (
-            f"Translate the following English sentence for a children's story into natural, fluent {lang}. "
-            f"Use simple, easy-to-understand vocabulary. The original text is: '{text}'.\n"
-            "IMPORTANT: Your entire response must be ONLY the translated text and nothing else. Do not add any explanations, options, or conversational filler."
-        )
-        response = gemini_model.generate_content(prompt)
-        narration_text = ""
-        if response.candidates:
-            candidate = response.candidates[0]
-            if candidate.content and candidate.content.parts:
-                narration_text = "".join(part.text for part in candidate.content.parts if part.text)
-        narration_text = response.text.strip()
+VOICE_ID = "MF4J4IDTRo0AxOO4dpFR"
+TTS_MODEL_ID = "eleven_multilingual_v2"
+
+
+def _translation_prompt(text: str, lang: str) -> str:
+    return (
+        f"Translate the following English sentence for a children's story into natural, fluent {lang}. "
+        f"Use simple, easy-to-understand vocabulary. The original text is: '{text}'.\n"
+        "IMPORTANT: Your entire response must be ONLY the translated text and nothing else. Do not add any explanations, options, or conversational filler."
+    )
 
-    # --- Step 2: Generate audio with ElevenLabs API ---
-    print("Generating high-quality narration via ElevenLabs...")
-    
 
-    voice_id = "MF4J4IDTRo0AxOO4dpFR" 
+def _translation_text(response) -> str:
+    narration_text = ""
+    if response.candidates:
+        candidate = response.candidates[0]
+        if candidate.content and candidate.content.parts:
+            narration_text = "".join(part.text for part in candidate.content.parts if part.text)
+    narration_text = response.text.strip()
+    return narration_text
 
+
+def _voice_settings(story_tone: str = None) -> dict:
     # Adjust voice settings based on the desired story tone for expressiveness
     if story_tone == "Bedtime":
-        voice_settings = {"stability": 0.95, "similarity_boost": 0.8, "style": 0.05, "speed": 0.85}
+        return {"stability": 0.95, "similarity_boost": 0.8, "style": 0.05, "speed": 0.85}
     elif story_tone == "Playtime":
-        voice_settings = {"stability": 0.40, "similarity_boost": 0.75, "style": 0.30, "speed": 1.05}
+        return {"stability": 0.40, "similarity_boost": 0.75, "style": 0.30, "speed": 1.05}
     elif story_tone == "Educational":
-        voice_settings = {"stability": 0.90, "similarity_boost": 0.75, "style": 0.15, "speed": 0.85}
+        return {"stability": 0.90, "similarity_boost": 0.75, "style": 0.15, "speed": 0.85}
     else:
-        voice_settings = {"stability": 0.75, "similarity_boost": 0.8, "style": 0.1, "speed": 1.00}
+        return {"stability": 0.75, "similarity_boost": 0.8, "style": 0.1, "speed": 1.00}
+
+
+def _write_silent_fallback(text: str, filename: str):
+    # --- Fallback: Create a silent audio file to prevent crashes ---
+    import numpy as np
+    import soundfile as sf
+    # Estimate duration based on text length (average reading speed)
+    estimated_duration_sec = len(text) / 15.0 
+    sampling_rate = 24000
+    silent_audio = np.zeros(int(estimated_duration_sec * sampling_rate), dtype=np.int16)
+    sf.write(filename, silent_audio, sampling_rate)
 
+
+def translate_text(text: str, lang: str) -> str:
+    """
+    Returns the narration text for `lang` (English text is used as-is).
+    """
+    if lang.lower() == "english":
+        return text
+    print(f"Translating the Story to {lang}..")
+    gemini_model = providers.get_gemini_model(TRANSLATION_MODEL_NAME)
+    prompt = _translation_prompt(text, lang)
+    start = time.perf_counter()
+    response = gemini_model.generate_content(prompt)
+    job_metrics.record_llm("translation", TRANSLATION_MODEL_NAME, response, prompt, time.perf_counter() - start)
+    return _translation_text(response)
+
+
+def generate_audio(text: str, lang: str, filename: str, story_tone: str = None, voice_id: str = VOICE_ID,
+                   narration_text: str = None, report_fallback: bool = False):
+    """
+    Generates narration audio in the user's chosen language.
+    Pass `narration_text` to reuse an existing translation of `text`.
+    Returns True on success and False on failure. When ElevenLabs keeps failing a
+    silent clip is written instead, which counts as success unless `report_fallback`
+    is set (then False is returned with the silent clip in place, for callers that
+    cache the audio and should retry it later).
+    """
+    # --- Step 1: Prepare narration text in the selected language ---
+    print(f"Preparing narration in language: {lang}")
+    if narration_text is None:
+        narration_text = translate_text(text, lang)
+
+    # --- Step 2: Generate audio with ElevenLabs API ---
+    print("Generating high-quality narration via ElevenLabs...")
+    voice_settings = _voice_settings(story_tone)
+
+    client = providers.get_elevenlabs_client()
     max_retries = 3
     for attempt in range(max_retries):
         try:
+            job_metrics.add("tts_calls")
             # Call the ElevenLabs API to convert the narration text to speech
             audio_stream = client.text_to_speech.convert(
                 voice_id=voice_id,
                 text=narration_text,
-                model_id="eleven_multilingual_v2",
+                model_id=TTS_MODEL_ID,
                 voice_settings=voice_settings,
             )
 
             # Write the received audio stream to a file
+            downloaded = 0
             with open(filename, "wb") as f:
                 for chunk in audio_stream:
                     f.write(chunk)
+                    downloaded += len(chunk)
+            job_metrics.add("tts_characters", len(narration_text))
+            job_metrics.add("bytes_downloaded", downloaded)
             print(f"Audio saved: {filename}")
             return True # Indicate success
 
@@ -72,15 +112,77 @@ def generate_audio(text: str, lang: str, filename: str, story_tone: str = None):
             if attempt < max_retries - 1:
                 wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s
                 print(f"   Retrying in {wait_time} seconds...")
+                job_metrics.add("tts_retries")
                 time.sleep(wait_time)
             else:
                 print("Max retries reached. Creating silent audio as a fallback.")
-                # --- Fallback: Create a silent audio file to prevent crashes ---
-                # Estimate duration based on text length (average reading speed)
-                estimated_duration_sec = len(text) / 15.0 
-                sampling_rate = 24000
-                silent_audio = np.zeros(int(estimated_duration_sec * sampling_rate), dtype=np.int16)
-                sf.write(filename, silent_audio, sampling_rate)
-                return True # Return True so the pipeline can continue with the silent clip
+                job_metrics.add("tts_fallbacks")
+                _write_silent_fallback(text, filename)
+                return not report_fallback # by default the pipeline continues with the silent clip
                 
     return False # Indicate failure after all retries
+
+
+async def generate_audio_async(text: str, lang: str, filename: str, story_tone: str = None, voice_id: str = VOICE_ID,
+                               narration_text: str = None, report_fallback: bool = False):
+    """
+    Async counterpart of generate_audio (async Gemini + AsyncElevenLabs, asyncio.sleep backoff).
+    """
+    import asyncio
+    import inspect
+    from pipeline import async_runtime
+
+    print(f"Preparing narration in language: {lang}")
+    if narration_text is None and lang.lower() == "english":
+        narration_text = text
+    elif narration_text is None:
+        print(f"Translating the Story to {lang}..")
+        gemini_model = providers.get_gemini_model(TRANSLATION_MODEL_NAME)
+        prompt = _translation_prompt(text, lang)
+        async with async_runtime.limit("llm"):
+            start = time.perf_counter()
+            response = await gemini_model.generate_content_async(prompt)
+        job_metrics.record_llm("translation", TRANSLATION_MODEL_NAME, response, prompt, time.perf_counter() - start)
+        narration_text = _translation_text(response)
+
+    print("Generating high-quality narration via ElevenLabs...")
+    voice_settings = _voice_settings(story_tone)
+
+    client = providers.get_async_elevenlabs_client()
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            async with async_runtime.limit("tts"):
+                job_metrics.add("tts_calls")
+                audio_stream = client.text_to_speech.convert(
+                    voice_id=voice_id,
+                    text=narration_text,
+                    model_id=TTS_MODEL_ID,
+                    voice_settings=voice_settings,
+                )
+                # Depending on the SDK version this is an async iterator or a coroutine returning one
+                if inspect.isawaitable(audio_stream):
+                    audio_stream = await audio_stream
+                chunks = [chunk async for chunk in audio_stream]
+
+            with open(filename, "wb") as f:
+                f.writelines(chunks)
+            job_metrics.add("tts_characters", len(narration_text))
+            job_metrics.add("bytes_downloaded", sum(len(chunk) for chunk in chunks))
+            print(f"Audio saved: {filename}")
+            return True
+
+        except Exception as e:
+            print(f"ElevenLabs API call failed on attempt {attempt + 1}/{max_retries}: {e}")
+            if attempt < max_retries - 1:
+                wait_time = 2 ** attempt
+                print(f"   Retrying in {wait_time} seconds...")
+                job_metrics.add("tts_retries")
+                await asyncio.sleep(wait_time)
+            else:
+                print("Max retries reached. Creating silent audio as a fallback.")
+                job_metrics.add("tts_fallbacks")
+                await async_runtime.run_cpu(_write_silent_fallback, text, filename)
+                return not report_fallback
+
+    return False
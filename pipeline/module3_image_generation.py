@@ -1,19 +1,18 @@
 # module_3_image_generator.py
 import os
-import io
 import time
 import requests
 from PIL import Image
 from typing import List, Dict, Any
-from dotenv import load_dotenv
-from pipeline.config import GOOGLE_API_KEY, ELEVEN_API_KEY, HF_API_TOKEN
+from pipeline import image_scheduler, image_batcher, job_metrics
 
 # --- Environment Setup ---
-load_dotenv()
-API_URL = "https://api-inference.huggingface.co/models/black-forest-labs/FLUX.1-schnell"
-headers = {"Authorization": f"Bearer {HF_API_TOKEN}"}
+# Endpoint list, hedging and failover live in image_scheduler; API_URL is the primary.
+# When CHITRAKATHA_IMAGE_BATCH_URL is set, shots go to that server via image_batcher instead.
+API_URL = image_scheduler.IMAGE_ENDPOINTS[0]["url"]
 
-def generate_image(visual_prompt: str, updated_cast: List[Dict[str, Any]], filename: str, shot_type: str):
+def _build_image_payload(visual_prompt: str, updated_cast: List[Dict[str, Any]], shot_type: str,
+                         seed_offset: int = 0) -> Dict[str, Any]:
     # --- Step 1: Build a consistent character block ---
     character_prompts = []
     seeds = []
@@ -77,6 +76,9 @@ def generate_image(visual_prompt: str, updated_cast: List[Dict[str, Any]], filen
         negative_prompt += ", anthropomorphic, human-like features, standing on two legs, wearing clothes"
 
     scene_seed = seeds[0] if seeds else None    
+    if seed_offset:
+        # Re-rolls of the same shot (story_project.regenerate_shot) step away from the cast seed
+        scene_seed = (scene_seed or 0) + seed_offset
     payload = {
         "inputs": full_prompt,
         "parameters": {
@@ -89,16 +91,24 @@ def generate_image(visual_prompt: str, updated_cast: List[Dict[str, Any]], filen
     }
 
     print(f"Generating image for prompt:\n{full_prompt}\nSeed used: {scene_seed}\n")
+    return payload
 
-    # --- Step 4: Call the API with retry logic ---
+
+def generate_image(visual_prompt: str, updated_cast: List[Dict[str, Any]], filename: str, shot_type: str,
+                   seed_offset: int = 0):
+    payload = _build_image_payload(visual_prompt, updated_cast, shot_type, seed_offset)
+
+    # --- Step 4: Call the API (batched, or hedged across endpoints) with retry logic ---
+    job_metrics.add("image_calls")
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            response = requests.post(API_URL, headers=headers, json=payload, timeout=180)
-            response.raise_for_status()
-            
-            image = Image.open(io.BytesIO(response.content))
+            if image_batcher.enabled():
+                image = image_batcher.request_image(payload)
+            else:
+                image = image_scheduler.request_image(payload)
             image.save(filename)
+            job_metrics.add("bytes_downloaded", image.info.get("download_bytes", 0))
             print(f"Image saved: {filename}")
             return True
 
@@ -107,10 +117,53 @@ def generate_image(visual_prompt: str, updated_cast: List[Dict[str, Any]], filen
             if attempt < max_retries - 1:
                 wait_time = 2 ** attempt
                 print(f"   Retrying in {wait_time} seconds...")
+                job_metrics.add("image_retries")
                 time.sleep(wait_time)
             else:
                 print("Max retries reached. Creating a placeholder image.")
+                job_metrics.add("image_placeholders")
                 Image.new('RGB', (1024, 1024), color='grey').save(filename)
                 return False
 
-    return False
\ No newline at end of file
+    return False
+
+
+async def generate_image_async(visual_prompt: str, updated_cast: List[Dict[str, Any]], filename: str, shot_type: str,
+                               seed_offset: int = 0):
+    """
+    Async counterpart of generate_image: same payload, batching/hedging and fallback,
+    with non-blocking requests and PNG encoding off the event loop.
+    """
+    import asyncio
+    from pipeline import async_runtime
+
+    payload = _build_image_payload(visual_prompt, updated_cast, shot_type, seed_offset)
+
+    job_metrics.add("image_calls")
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            async with async_runtime.limit("image"):
+                if image_batcher.enabled():
+                    image = await image_batcher.request_image_async(payload)
+                else:
+                    image = await image_scheduler.request_image_async(payload)
+            await async_runtime.run_cpu(image.save, filename)
+            job_metrics.add("bytes_downloaded", image.info.get("download_bytes", 0))
+            print(f"Image saved: {filename}")
+            return True
+
+        except requests.exceptions.RequestException as e:
+            print(f"Image generation failed on attempt {attempt + 1}/{max_retries}: {e}")
+            if attempt < max_retries - 1:
+                wait_time = 2 ** attempt
+                print(f"   Retrying in {wait_time} seconds...")
+                job_metrics.add("image_retries")
+                await asyncio.sleep(wait_time)
+            else:
+                print("Max retries reached. Creating a placeholder image.")
+                job_metrics.add("image_placeholders")
+                await async_runtime.run_cpu(Image.new('RGB', (1024, 1024), color='grey').save, filename)
+                return False
+
+    return False
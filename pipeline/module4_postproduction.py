@@ -1,46 +1,68 @@
 import os
-from moviepy.editor import (
-    ImageClip, AudioFileClip, CompositeVideoClip, concatenate_videoclips, concatenate_audioclips, TextClip, vfx
-)
-from PIL import Image
-import moviepy.audio.fx.all as afx
-import numpy as np
-from pipeline.config import GOOGLE_API_KEY, ELEVEN_API_KEY, HF_API_TOKEN
-
-def create_scene_clip(image_path: str, audio_clip: AudioFileClip, subtitle_text: str):
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from moviepy.editor import AudioFileClip
+
+# moviepy.editor is heavy (it spins up ffmpeg discovery and imports every fx),
+# so it is only imported once a clip is actually being built.
+CROSSFADE_DURATION = 0.5  # seconds between consecutive clips
+
+def _ken_burns_frame(canvas, t: float, duration: float, zoom_factor: float, pan_start: float, pan_end: float, size=None):
+    """
+    Renders one Ken Burns frame straight from the canonical canvas: the visible window
+    is cropped out of the (memory-mapped) array and resampled once to `size` (w, h),
+    which defaults to the canvas size.
+    """
+    from PIL import Image
+    import numpy as np
+
+    h, w = canvas.shape[:2]
+    progress = min(max(t / duration, 0.0), 1.0) if duration else 0.0
+
+    zoom = 1 + (zoom_factor - 1) * progress
+    win_w, win_h = w / zoom, h / zoom
+    pan = pan_start + (pan_end - pan_start) * progress
+    left = min(max((w - win_w) / 2 + pan * w, 0.0), w - win_w)
+    top = (h - win_h) / 2
+
+    # Slice only the rows/columns we need so unused pages of the canvas are never touched
+    x0, y0 = int(left), int(top)
+    x1, y1 = min(w, int(np.ceil(left + win_w)) + 1), min(h, int(np.ceil(top + win_h)) + 1)
+    window = Image.fromarray(np.ascontiguousarray(canvas[y0:y1, x0:x1]))
+    frame = window.resize(size or (w, h), Image.BILINEAR, box=(left - x0, top - y0, left - x0 + win_w, top - y0 + win_h))
+    return np.asarray(frame)
+
+
+def create_scene_clip(image_path: str, audio_clip: "AudioFileClip", subtitle_text: str, quality: str = "final"):
     """
     Creates a professional-quality video scene with smooth, slow Ken Burns effect
     (stable zoom + slow horizontal pan) and Netflix-style subtitles.
+    `image_path` may be a stored canvas from image_store.normalize_image (memory-mapped)
+    or a raw image, which is normalized in memory. `quality` picks the output size
+    from render_profiles.
     """
+    from moviepy.editor import VideoClip, CompositeVideoClip, TextClip
+    from pipeline import image_store, render_profiles
+
     duration = audio_clip.duration
 
-    img_clip = ImageClip(image_path).resize(height=1080).set_duration(duration)
-    w, h = img_clip.size
+    canvas = image_store.open_canvas(image_path)
+    w, h = render_profiles.frame_size(render_profiles.get_render_profile(quality))
 
     # --- Stable Ken Burns Effect: zoom + left-to-right pan ---
     zoom_factor = 1.15
     pan_start = -0.02
     pan_end = 0.02
 
-    # Apply smooth zoom using moviepy's built-in, optimized vfx
-    animated_clip = img_clip.fx(vfx.resize, lambda t: 1 + (zoom_factor - 1) * (t / duration))
-    
-    # Apply slow left-to-right pan using moviepy's built-in scroll effect
-    animated_clip = animated_clip.fx(
-        vfx.scroll,
-        w=animated_clip.w, # Use the zoomed width
-        h=animated_clip.h, # Use the zoomed height
-        x_speed=(pan_end - pan_start) * w / duration,
-        y_speed=0
+    animated_clip = VideoClip(
+        lambda t: _ken_burns_frame(canvas, t, duration, zoom_factor, pan_start, pan_end, (w, h)),
+        duration=duration
     )
-    
-    # Crop the animated clip back to the original size
-    animated_clip = animated_clip.crop(x_center=animated_clip.w/2, y_center=animated_clip.h/2, width=w, height=h)
-
 
     # --- Subtitles with automatic wrapping and padding ---
     max_subtitle_width = int(w * 0.80) 
-    font_size = 24
+    font_size = max(16, round(24 * h / 1080))
 
     subtitle_clip = TextClip(
         subtitle_text,
@@ -60,35 +82,123 @@ def create_scene_clip(image_path: str, audio_clip: AudioFileClip, subtitle_text:
     return final_clip
 
 
-def assemble_video(clips: list, output_filename="final_story.mp4", crossfade_duration=0.5):
-
+def render_segment(clips: list, video_filename: str, narration_filename: str, crossfade_duration=CROSSFADE_DURATION,
+                   quality: str = "final", encoder_profile: str = None, audio_groups: list = None,
+                   edge_fade: float = 0.0) -> float:
+    """
+    Encodes the scene clips with crossfades to a video-only file and writes the
+    narration track for the same timeline (audio_timeline, one NumPy pass) as WAV.
+    `audio_groups` gives clips that share a loudness gain the same key (e.g. shots of
+    one scene); `edge_fade` fades the segment in from and out to black, for segments
+    that are later joined by concatenate_segments. Returns the segment duration.
+    """
     if not clips:
         raise ValueError("No clips were provided for video assembly.")
 
-    print("Assembling final animated video...")
+    from moviepy.editor import concatenate_videoclips, vfx
+    from pipeline import render_profiles, encoder_profiles, audio_timeline, job_metrics
+
+    audio_paths = [getattr(c.audio, "filename", None) for c in clips]
+    if not all(audio_paths):
+        raise ValueError("Every clip needs file-backed audio (AudioFileClip or clip_resources.lazy_audio_file_clip).")
+
+    profile = render_profiles.get_render_profile(quality)
+    encoder = encoder_profiles.get_encoder_profile(encoder_profile or profile["encoder"])
+
+    print(f"Assembling animated video ({profile['name']} quality, {encoder['name']} encoder)...")
 
     faded_clips = [clips[0]]
     for clip in clips[1:]:
         faded_clips.append(clip.crossfadein(crossfade_duration))
         
     final_video = concatenate_videoclips(faded_clips, padding=-crossfade_duration, method="compose")
-    
-    audio_clips = [c.audio for c in clips]
-
-    final_audio = concatenate_audioclips(audio_clips).fx(afx.audio_fadeout, crossfade_duration)
-    
-    # 4. Set the final audio to the final video.
-    final_video.audio = final_audio
-
-    # GPU-accelerated / multi-threaded encoding
-    final_video.write_videofile(
-        output_filename,
-        fps=24,
-        codec="libx264",           
-        audio_codec="aac",
-        threads=os.cpu_count(),
-        preset="fast",
-        ffmpeg_params=["-crf", "20"],
-        temp_audiofile="temp-audio.m4a",
-        remove_temp=True
+    # concatenate_videoclips also applies the (negative) padding after the last clip,
+    # which would cut its final `crossfade_duration`: only the overlaps are subtracted
+    final_video = final_video.set_duration(sum(c.duration for c in clips) - (len(clips) - 1) * crossfade_duration)
+    if edge_fade:
+        final_video = final_video.fx(vfx.fadein, edge_fade).fx(vfx.fadeout, edge_fade)
+
+    # Narration on the same crossfaded timeline as the video (and with the same edge fades)
+    with job_metrics.measure("narration"):
+        audio_timeline.write_wav(
+            audio_timeline.build_narration_track(
+                audio_paths, [c.duration for c in clips], crossfade_duration,
+                groups=audio_groups, total_duration=final_video.duration,
+                fade_in=edge_fade, fade_out=edge_fade or None
+            ),
+            narration_filename
+        )
+
+    # x264 settings for slow-pan stills, with keyframes where each new scene is fully in
+    ffmpeg_params = encoder_profiles.build_ffmpeg_params(
+        encoder, profile, final_video.w, final_video.h,
+        keyframe_times=encoder_profiles.scene_boundaries([c.duration for c in clips], crossfade_duration)
     )
+    try:
+        with job_metrics.measure("encode"):
+            final_video.write_videofile(
+                video_filename,
+                fps=profile["fps"],
+                codec="libx264",           
+                audio=False,
+                threads=encoder_profiles.ENCODER_THREADS,
+                preset=profile["preset"],
+                ffmpeg_params=ffmpeg_params
+            )
+        return final_video.duration
+    finally:
+        final_video.close()
+
+
+def assemble_video(clips: list, output_filename="final_story.mp4", crossfade_duration=CROSSFADE_DURATION, quality: str = "final",
+                   encoder_profile: str = None, audio_groups: list = None):
+    """
+    Renders the scene clips with crossfades (render_segment) and muxes the narration
+    track next to the encoded video.
+    """
+    from pipeline import render_profiles, audio_timeline, job_metrics
+
+    # Intermediate files live next to the output so concurrent jobs never share them
+    base_path = os.path.splitext(output_filename)[0]
+    video_only_path = base_path + "-video.mp4"
+    narration_path = base_path + "-narration.wav"
+    try:
+        render_segment(clips, video_only_path, narration_path, crossfade_duration, quality, encoder_profile, audio_groups)
+        with job_metrics.measure("mux"):
+            audio_timeline.mux(video_only_path, narration_path, output_filename,
+                               audio_bitrate=render_profiles.get_render_profile(quality)["audio_bitrate"])
+    finally:
+        for path in (video_only_path, narration_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def concatenate_segments(segments: list, output_filename: str, quality: str = "final"):
+    """
+    Joins segments from render_segment, given as (video_filename, narration_filename)
+    pairs in story order: the video streams are stream-copied and the narration WAVs
+    are laid end to end, each padded/trimmed to its segment's video duration so the
+    audio cannot drift across segments.
+    """
+    if not segments:
+        raise ValueError("No segments were provided for video assembly.")
+
+    import numpy as np
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    from pipeline import render_profiles, audio_timeline, job_metrics
+
+    tracks = []
+    for video_path, narration_path in segments:
+        infos = ffmpeg_parse_infos(video_path)
+        length = int(round(infos["video_duration"] * audio_timeline.SAMPLE_RATE))
+        samples = audio_timeline.decode_audio(narration_path)
+        tracks.append(samples[:length] if len(samples) >= length else np.pad(samples, ((0, length - len(samples)), (0, 0))))
+
+    narration_path = audio_timeline.write_wav(np.concatenate(tracks), os.path.splitext(output_filename)[0] + "-narration.wav")
+    try:
+        with job_metrics.measure("mux"):
+            audio_timeline.concat_mux([video for video, _ in segments], narration_path, output_filename,
+                                      audio_bitrate=render_profiles.get_render_profile(quality)["audio_bitrate"])
+    finally:
+        os.remove(narration_path)
+    return output_filename
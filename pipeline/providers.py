@@ -0,0 +1,103 @@
+import threading
+import weakref
+from typing import Dict, Any
+
+# --- Lazily constructed, process-wide provider clients ---
+# Nothing here touches the network or imports a provider SDK until a stage
+# actually asks for a client, so `import pipeline` stays cheap.
+_lock = threading.Lock()
+_gemini_configured = False
+_gemini_models: Dict[str, Any] = {}
+_elevenlabs_client = None
+# Async clients hold connection pools bound to one event loop, so they are cached per loop
+_async_clients: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+def get_gemini_model(model_name: str):
+    """
+    Returns the shared GenerativeModel for `model_name`, configuring the SDK on first use.
+    """
+    global _gemini_configured
+    model = _gemini_models.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _gemini_models.get(model_name)
+        if model is None:
+            import google.generativeai as genai
+
+            if not _gemini_configured:
+                from pipeline.config import GOOGLE_API_KEY
+                genai.configure(api_key=GOOGLE_API_KEY)
+                _gemini_configured = True
+            model = genai.GenerativeModel(model_name)
+            _gemini_models[model_name] = model
+    return model
+
+
+def get_elevenlabs_client():
+    """
+    Returns the shared ElevenLabs client, constructing it on first use.
+    """
+    global _elevenlabs_client
+    if _elevenlabs_client is not None:
+        return _elevenlabs_client
+
+    with _lock:
+        if _elevenlabs_client is None:
+            from elevenlabs.client import ElevenLabs
+            from pipeline.config import ELEVEN_API_KEY
+            _elevenlabs_client = ElevenLabs(api_key=ELEVEN_API_KEY)
+    return _elevenlabs_client
+
+
+def _loop_clients() -> Dict[str, Any]:
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    with _lock:
+        return _async_clients.setdefault(loop, {})
+
+
+def get_async_elevenlabs_client():
+    """
+    Returns the AsyncElevenLabs client for the running event loop, constructing it on first use.
+    """
+    clients = _loop_clients()
+    if "elevenlabs" not in clients:
+        from elevenlabs.client import AsyncElevenLabs
+        from pipeline.config import ELEVEN_API_KEY
+        clients["elevenlabs"] = AsyncElevenLabs(api_key=ELEVEN_API_KEY)
+    return clients["elevenlabs"]
+
+
+def get_async_http_client():
+    """
+    Returns a shared httpx.AsyncClient for the running event loop (used for image endpoints).
+    """
+    clients = _loop_clients()
+    if "http" not in clients:
+        import httpx
+        clients["http"] = httpx.AsyncClient(limits=httpx.Limits(max_connections=64))
+    return clients["http"]
+
+
+def get_hf_headers() -> Dict[str, str]:
+    """
+    Returns the auth headers for the Hugging Face Inference API.
+    """
+    from pipeline.config import HF_API_TOKEN
+    return {"Authorization": f"Bearer {HF_API_TOKEN}"}
+
+
+def reset_providers():
+    """
+    Drops all cached clients (e.g. after rotating API keys or in a forked worker).
+    """
+    global _gemini_configured, _elevenlabs_client
+    with _lock:
+        _gemini_models.clear()
+        _gemini_configured = False
+        _elevenlabs_client = None
+        _async_clients.clear()
@@ -0,0 +1,33 @@
+from typing import Dict, Any, Tuple
+
+# --- Render quality tiers ---
+# "draft" is meant to be returned to the user as fast as possible; "final" is the
+# original 1080p output and is normally rendered in the background afterwards.
+# "encoder" names an encoder_profiles entry (None = that module's default).
+RENDER_PROFILES: Dict[str, Dict[str, Any]] = {
+    "draft": {"height": 480, "fps": 12, "preset": "ultrafast", "crf": 30, "audio_bitrate": "64k", "encoder": "generic"},
+    "standard": {"height": 720, "fps": 24, "preset": "veryfast", "crf": 23, "audio_bitrate": "128k", "encoder": None},
+    "final": {"height": 1080, "fps": 24, "preset": "fast", "crf": 20, "audio_bitrate": "192k", "encoder": None},
+}
+
+DEFAULT_PROFILE = "final"
+
+
+def get_render_profile(name: str = None) -> Dict[str, Any]:
+    """
+    Returns a copy of the named profile; unknown names fall back to the default with a warning.
+    """
+    name = (name or DEFAULT_PROFILE).lower()
+    if name not in RENDER_PROFILES:
+        print(f"[Render Profiles] Unknown quality '{name}'. Using '{DEFAULT_PROFILE}'.")
+        name = DEFAULT_PROFILE
+    return {"name": name, **RENDER_PROFILES[name]}
+
+
+def frame_size(profile: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Output (width, height) for a 16:9 profile; both even, as yuv420p requires.
+    """
+    height = profile["height"]
+    width = round(height * 16 / 9)
+    return width + (width % 2), height + (height % 2)
@@ -0,0 +1,138 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Any, Optional
+
+# --- Background renders ---
+# Higher-quality re-renders run on a small process-wide pool so the request that
+# produced the draft can return straight away.
+RENDER_WORKERS = int(os.environ.get("CHITRAKATHA_RENDER_WORKERS", 1))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_renders: Dict[str, Future] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+        return _executor
+
+
+def _build_clips(scenes: List[Dict[str, Any]], quality: str, video_clips: list) -> list:
+    """
+    Builds one clip per shot entry. A shot whose entry has "audio_part": [shot, shot_count]
+    plays its part of the scene narration in "audio_path" (audio_timeline.shot_spans).
+    """
+    from pipeline import module4_postproduction, clip_resources, audio_timeline, job_metrics
+
+    durations = {}  # narration file -> duration, probed once per scene
+    with job_metrics.measure("clip_build"):
+        for scene in scenes:
+            audio_path = scene["audio_path"]
+            if audio_path not in durations:
+                durations[audio_path] = clip_resources.probe_duration(audio_path)
+            audio_clip = clip_resources.lazy_audio_file_clip(audio_path, duration=durations[audio_path])
+            if scene.get("audio_part"):
+                shot, shot_count = scene["audio_part"]
+                audio_clip = audio_clip.subclip(*audio_timeline.shot_spans(
+                    durations[audio_path], shot_count, module4_postproduction.CROSSFADE_DURATION)[shot])
+            video_clips.append(module4_postproduction.create_scene_clip(
+                image_path=scene["image_path"],
+                audio_clip=audio_clip,
+                subtitle_text=scene["subtitle_text"],
+                quality=quality
+            ))
+    return video_clips
+
+
+def render_story(scenes: List[Dict[str, Any]], output_filename: str, quality: str = "final") -> str:
+    """
+    Builds the scene clips from their stored assets (canvas + narration per shot),
+    renders them with the given quality profile and releases every clip afterwards.
+    """
+    from pipeline import module4_postproduction, clip_resources
+
+    video_clips = []
+    try:
+        module4_postproduction.assemble_video(
+            _build_clips(scenes, quality, video_clips), output_filename=output_filename, quality=quality,
+            audio_groups=[scene.get("scene_index", i) for i, scene in enumerate(scenes)]
+        )
+    finally:
+        clip_resources.close_clips(video_clips)
+    return output_filename
+
+
+def render_segment(scenes: List[Dict[str, Any]], video_filename: str, narration_filename: str,
+                   quality: str = "final", edge_fade: float = 0.0) -> str:
+    """
+    Like render_story, but leaves a video-only segment and its narration WAV for
+    module4_postproduction.concatenate_segments (used by story_project).
+    """
+    from pipeline import module4_postproduction, clip_resources
+
+    video_clips = []
+    try:
+        module4_postproduction.render_segment(
+            _build_clips(scenes, quality, video_clips), video_filename, narration_filename, quality=quality,
+            audio_groups=[scene.get("scene_index", i) for i, scene in enumerate(scenes)], edge_fade=edge_fade
+        )
+    finally:
+        clip_resources.close_clips(video_clips)
+    return video_filename
+
+
+def submit_render(scenes: List[Dict[str, Any]], output_filename: str, quality: str = "final", cleanup_folder: str = None) -> Future:
+    """
+    Queues render_story in the background. `cleanup_folder` (the shared temp assets)
+    is removed once the render finishes, successfully or not. The render is accounted
+    to the submitting job, whose stored metrics are updated when it finishes (with
+    status "final_render_failed" if it fails).
+    """
+    from pipeline import job_metrics
+
+    metrics = job_metrics.current()
+
+    def job():
+        try:
+            render_story(scenes, output_filename, quality)
+            print(f"[Render Queue] {quality} render ready: {output_filename}")
+            return output_filename
+        except Exception as e:
+            print(f"[Render Queue] {quality} render of {output_filename} failed: {e}")
+            if os.path.exists(output_filename):
+                os.remove(output_filename)  # never leave a truncated video behind
+            if metrics is not None:
+                metrics.status = "final_render_failed"
+            raise
+        finally:
+            if cleanup_folder:
+                shutil.rmtree(cleanup_folder, ignore_errors=True)
+            if metrics is not None:
+                job_metrics.save_job(metrics)
+
+    future = _get_executor().submit(job_metrics.bind(job))
+    with _lock:
+        _renders[output_filename] = future
+    future.add_done_callback(lambda f: _forget_render(output_filename, f))
+    return future
+
+
+def _forget_render(output_filename: str, future: Future):
+    with _lock:
+        if _renders.get(output_filename) is future:
+            del _renders[output_filename]
+
+
+def get_render(output_filename: str) -> Optional[Future]:
+    """
+    Returns the Future of a pending render for `output_filename`. Finished renders are
+    dropped from the queue, so None also means "done": a successful render has left
+    its file at `output_filename`, a failed one has not.
+    """
+    with _lock:
+        return _renders.get(output_filename)
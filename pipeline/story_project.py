@@ -0,0 +1,353 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from pipeline import (
+    module0_casting,
+    module1_screenwriting,
+    module2_voiceover,
+    module3_image_generation,
+    image_store,
+    render_profiles,
+    render_queue,
+    job_metrics
+)
+
+# --- Editable story projects ---
+# A project keeps every asset of a generated story on disk together with the
+# dependency graph between them (per scene):
+#
+#   sentence ──> translation ──> audio ──┐
+#   shot prompt (+ variant) ──> image ──> canvas ──┴──> segment ──> final video
+#
+# Each node records a fingerprint of the inputs it was built from. Edits only change
+# source values (sentence, shot prompt, tone, voice, language); render() then rebuilds
+# exactly the nodes whose fingerprint no longer matches and joins the final video
+# from the cached per-scene segments with a stream copy.
+PROJECT_FILE = "project.json"
+SEGMENT_EDGE_FADE = 0.25  # seconds of fade to/from black at scene boundaries
+
+
+def _fingerprint(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+class StoryProject:
+    """
+    A generated story and its cached assets. Scene and shot indexes are 0-based.
+    """
+
+    def __init__(self, folder: str, state: Dict[str, Any]):
+        self.folder = folder
+        self.state = state
+        self.last_build: Dict[str, Any] = {}
+        self._visited: set = set()
+        self._reused: List[str] = []
+        self._rebuilt: List[str] = []
+
+    # --- Persistence ---
+    def save(self):
+        path = os.path.join(self.folder, PROJECT_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def _path(self, relative_path: str) -> str:
+        return os.path.join(self.folder, relative_path)
+
+    @property
+    def scenes(self) -> List[Dict[str, Any]]:
+        return self.state["scenes"]
+
+    @property
+    def story_text(self) -> str:
+        return " ".join(scene["sentence"] for scene in self.scenes)
+
+    def _scene(self, scene_index: int) -> Dict[str, Any]:
+        if not 0 <= scene_index < len(self.scenes):
+            raise IndexError(f"Scene {scene_index} does not exist (project has {len(self.scenes)} scenes).")
+        return self.scenes[scene_index]
+
+    # --- Edits (each returns the nodes the next render() will rebuild) ---
+    def replace_sentence(self, scene_index: int, sentence: str, shots: List[str] = None) -> List[str]:
+        """
+        Replaces a scene's narration (translation, audio and segment are rebuilt).
+        Passing `shots` also replaces the scene's visual prompts.
+        """
+        scene = self._scene(scene_index)
+        scene["sentence"] = sentence
+        if shots is not None:
+            scene["shots"] = [{"prompt": prompt, "variant": 0} for prompt in ([shots] if isinstance(shots, str) else shots)]
+        self.save()
+        return self.stale_nodes()
+
+    def regenerate_shot(self, scene_index: int, shot_index: int, visual_prompt: str = None) -> List[str]:
+        """
+        Re-rolls one shot's image with a new seed, optionally with a new prompt.
+        """
+        shots = self._scene(scene_index)["shots"]
+        if not 0 <= shot_index < len(shots):
+            raise IndexError(f"Shot {shot_index} does not exist in scene {scene_index}.")
+        shots[shot_index]["variant"] += 1
+        if visual_prompt is not None:
+            shots[shot_index]["prompt"] = visual_prompt
+        self.save()
+        return self.stale_nodes()
+
+    def change_tone(self, tone: str) -> List[str]:
+        """
+        Re-voices every scene with the tone's voice settings. The story text and
+        images are kept (the tone only shaped them when the project was created).
+        """
+        self.state["tone"] = tone
+        self.save()
+        return self.stale_nodes()
+
+    def change_voice(self, voice_id: str) -> List[str]:
+        self.state["voice_id"] = voice_id
+        self.save()
+        return self.stale_nodes()
+
+    def change_language(self, language: str) -> List[str]:
+        self.state["language"] = language
+        self.save()
+        return self.stale_nodes()
+
+    # --- Dependency graph ---
+    def _node(self, key: str, fingerprint: str, build, dry_run: bool):
+        """
+        Returns the cached value of node `key` if it was built from `fingerprint` and
+        its files still exist; otherwise rebuilds it (or, in a dry run, returns None).
+        `build()` returns (value, files, complete); incomplete results (placeholder
+        images, silent fallback audio, and everything built from them) are used for this render but rebuilt
+        next time. What a build cost is kept with the node, so reusing it counts as a
+        cache saving (job_metrics).
+        """
+        self._visited.add(key)
+        node = self.state["nodes"].get(key)
+        if node and node["fingerprint"] == fingerprint and all(os.path.exists(self._path(p)) for p in node["files"]):
+            self._reused.append(key)
+            if not dry_run:
+                job_metrics.record_cache_hit(node.get("cost"))
+            return node["value"]
+
+        self._rebuilt.append(key)
+        if dry_run:
+            return None
+        job_metrics.add("cache_misses")
+        before = job_metrics.snapshot()
+        value, files, complete = build()
+        self.state["nodes"][key] = {"fingerprint": fingerprint if complete else None, "value": value, "files": files,
+                                    "cost": job_metrics.cost_since(before)}
+        self.save()  # an interrupted render resumes from the nodes already built
+        return value
+
+    def _complete(self, *keys: str) -> bool:
+        """
+        Whether the nodes were built from real inputs (no placeholder upstream).
+        """
+        return all(self.state["nodes"][key]["fingerprint"] is not None for key in keys)
+
+    def _walk(self, dry_run: bool) -> List[Dict[str, Any]]:
+        """
+        Visits every node in dependency order and returns the scenes' segment entries.
+        """
+        language, tone, voice_id = self.state["language"], self.state["tone"], self.state["voice_id"]
+        profile = render_profiles.get_render_profile(self.state["quality"])
+        segments = []
+
+        for i, scene in enumerate(self.scenes):
+            label = f"scene_{i+1:02d}"
+            sentence = scene["sentence"]
+            os.makedirs(self._path(label), exist_ok=True)
+
+            # Translation is a value node: an unchanged translation keeps the audio cached
+            narration_text = self._node(
+                f"{label}/translation",
+                _fingerprint("translation", sentence, language, module2_voiceover.TRANSLATION_MODEL_NAME),
+                lambda: (module2_voiceover.translate_text(sentence, language), [], True),
+                dry_run
+            )
+
+            audio_file = f"{label}/audio.mp3"
+            audio_fingerprint = _fingerprint("audio", narration_text, tone, voice_id, module2_voiceover.TTS_MODEL_ID)
+
+            def build_audio():
+                # Silent fallback audio (ElevenLabs unavailable) is used for this render only
+                ok = module2_voiceover.generate_audio(
+                    text=sentence, lang=language, filename=self._path(audio_file), story_tone=tone,
+                    voice_id=voice_id, narration_text=narration_text, report_fallback=True
+                )
+                if not os.path.exists(self._path(audio_file)):
+                    raise RuntimeError(f"Audio generation failed for {label}.")
+                return audio_file, [audio_file], ok
+
+            self._node(f"{label}/audio", audio_fingerprint, build_audio, dry_run)
+
+            canvas_files, canvas_fingerprints, canvas_keys = [], [], []
+            for j, shot in enumerate(scene["shots"]):
+                shot_label = f"{label}/shot_{j+1:02d}"
+                image_file, canvas_file = f"{shot_label}.png", shot_label + image_store.CANVAS_SUFFIX
+                image_fingerprint = _fingerprint("image", shot["prompt"], scene["characters"], scene["shot_type"], shot["variant"])
+
+                def build_image():
+                    ok = module3_image_generation.generate_image(
+                        visual_prompt=shot["prompt"], updated_cast=scene["characters"], filename=self._path(image_file),
+                        shot_type=scene["shot_type"], seed_offset=shot["variant"]
+                    )
+                    return image_file, [image_file], ok
+
+                def build_canvas():
+                    image_store.normalize_image(self._path(image_file), self._path(canvas_file))
+                    return canvas_file, [canvas_file], self._complete(f"{shot_label}/image")
+
+                self._node(f"{shot_label}/image", image_fingerprint, build_image, dry_run)
+                canvas_fingerprint = _fingerprint("canvas", image_fingerprint, image_store.CANVAS_SIZE)
+                self._node(f"{shot_label}/canvas", canvas_fingerprint, build_canvas, dry_run)
+                canvas_files.append(canvas_file)
+                canvas_fingerprints.append(canvas_fingerprint)
+                canvas_keys.append(f"{shot_label}/canvas")
+
+            video_file, narration_file = f"{label}/segment.mp4", f"{label}/segment.wav"
+            segment_fingerprint = _fingerprint("segment", audio_fingerprint, canvas_fingerprints, sentence, profile,
+                                               SEGMENT_EDGE_FADE)
+
+            def build_segment():
+                render_queue.render_segment(
+                    [{"image_path": self._path(canvas), "audio_path": self._path(audio_file),
+                      "audio_part": [j, len(canvas_files)], "subtitle_text": sentence, "scene_index": i}
+                     for j, canvas in enumerate(canvas_files)],
+                    self._path(video_file), self._path(narration_file),
+                    quality=profile["name"], edge_fade=SEGMENT_EDGE_FADE
+                )
+                return video_file, [video_file, narration_file], self._complete(f"{label}/audio", *canvas_keys)
+
+            self._node(f"{label}/segment", segment_fingerprint, build_segment, dry_run)
+            segments.append({"key": f"{label}/segment", "fingerprint": segment_fingerprint, "video": video_file,
+                             "narration": narration_file})
+
+        return segments
+
+    def _output_file(self) -> str:
+        name = render_profiles.get_render_profile(self.state["quality"])["name"]
+        return "final_story.mp4" if name == "final" else f"{name}_story.mp4"
+
+    def _final_fingerprint(self, segments: List[Dict[str, Any]]) -> str:
+        return _fingerprint("final", [s["fingerprint"] for s in segments], self._output_file())
+
+    def stale_nodes(self) -> List[str]:
+        """
+        Nodes the next render() will rebuild. Nodes below a stale translation are
+        listed too, although they are kept if the new translation comes out the same.
+        """
+        self._visited, self._reused, self._rebuilt = set(), [], []
+        segments = self._walk(dry_run=True)
+        self._node("final", self._final_fingerprint(segments), None, dry_run=True)
+        return list(self._rebuilt)
+
+    def render(self, quality: str = None) -> str:
+        """
+        Brings every stale node up to date and returns the path of the story video.
+        `quality` switches the project's render profile (which re-renders all segments).
+        The job's metrics, including what the cache saved, end up in last_build.
+        """
+        if quality is not None:
+            self.state["quality"] = render_profiles.get_render_profile(quality)["name"]
+
+        labels = {name: self.state[name] for name in ("prompt", "language", "tone", "quality")}
+        with job_metrics.track_job("render", **labels) as job:
+            output_path = self._render()
+        self.last_build["metrics"] = job.summary()
+        return output_path
+
+    def _render(self) -> str:
+        start = time.time()
+        self._visited, self._reused, self._rebuilt = set(), [], []
+        segments = self._walk(dry_run=False)
+
+        output_file = self._output_file()
+
+        def build_final():
+            from pipeline import module4_postproduction
+            module4_postproduction.concatenate_segments(
+                [(self._path(s["video"]), self._path(s["narration"])) for s in segments],
+                self._path(output_file), quality=self.state["quality"]
+            )
+            return output_file, [output_file], self._complete(*[s["key"] for s in segments])
+
+        output_file = self._node("final", self._final_fingerprint(segments), build_final, dry_run=False)
+
+        # Drop nodes (and files) that no longer belong to the story, e.g. removed shots
+        for key in [key for key in self.state["nodes"] if key not in self._visited]:
+            for path in self.state["nodes"].pop(key)["files"]:
+                if os.path.exists(self._path(path)):
+                    os.remove(self._path(path))
+        self.save()
+
+        self.last_build = {"rebuilt": list(self._rebuilt), "reused": list(self._reused), "seconds": round(time.time() - start, 2)}
+        print(f"[Story Project] Rebuilt {len(self._rebuilt)} node(s), reused {len(self._reused)} "
+              f"in {self.last_build['seconds']:.1f}s: {self._path(output_file)}")
+        return self._path(output_file)
+
+
+def create_story_project(prompt: str, language: str = "English", tone: str = "Default", quality: str = "final",
+                         voice_id: str = None, folder: Optional[str] = None) -> StoryProject:
+    """
+    Writes a story (casting, story text, scene list) into a new editable project.
+    Nothing is rendered until render() is called.
+    """
+    with job_metrics.track_job("project", prompt=prompt, language=language, tone=tone, quality=quality):
+        return _create_story_project(prompt, language, tone, quality, voice_id, folder)
+
+
+def _create_story_project(prompt: str, language: str, tone: str, quality: str, voice_id: Optional[str],
+                          folder: Optional[str]) -> StoryProject:
+    rich_concept, cast_list = module0_casting.enrich_prompt(simple_prompt=prompt, story_tone=tone)
+    story_text = module1_screenwriting.generate_story_text(rich_concept, cast_list)
+    scene_list = module1_screenwriting.generate_scene_list_from_story(story_text, cast_list, rich_concept)
+    if not scene_list:
+        raise ValueError("Failed to generate story content. Please try a different prompt.")
+
+    scenes = []
+    for i, scene_data in enumerate(scene_list):
+        sentence = scene_data.get("sentence")
+        shots = scene_data.get("shot", [])
+        characters = scene_data.get("characters", [])
+        if not sentence or not shots or not characters:
+            print(f"Scene {i+1} missing critical data. Skipping.")
+            continue
+        scenes.append({
+            "sentence": sentence,
+            "characters": characters,
+            "shot_type": scene_data.get("shot_type", []),
+            "shots": [{"prompt": prompt, "variant": 0} for prompt in ([shots] if isinstance(shots, str) else shots)],
+        })
+    if not scenes:
+        raise ValueError("Video generation failed. No valid scenes created.")
+
+    folder = folder or f"generated_story_{uuid.uuid4().hex[:8]}"
+    os.makedirs(folder, exist_ok=True)
+    project = StoryProject(folder, {
+        "prompt": prompt,
+        "language": language,
+        "tone": tone,
+        "voice_id": voice_id or module2_voiceover.VOICE_ID,
+        "quality": render_profiles.get_render_profile(quality)["name"],
+        "rich_concept": rich_concept,
+        "cast_list": cast_list,
+        "scenes": scenes,
+        "nodes": {},
+    })
+    project.save()
+    return project
+
+
+def load_story_project(folder: str) -> StoryProject:
+    """
+    Opens a project written by create_story_project.
+    """
+    with open(os.path.join(folder, PROJECT_FILE), encoding="utf-8") as f:
+        return StoryProject(folder, json.load(f))
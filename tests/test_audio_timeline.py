@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from pipeline import audio_timeline
+
+
+def _constant(path, seconds, level):
+    samples = np.full((int(seconds * audio_timeline.SAMPLE_RATE), 2), level, dtype=np.float32)
+    return audio_timeline.write_wav(samples, str(path))
+
+
+def test_shot_spans_cover_the_scene_once_crossfaded():
+    spans = audio_timeline.shot_spans(3.0, 3, crossfade_duration=0.5)
+    assert spans == [(0.0, 1.5), (1.0, 2.5), (2.0, 3.0)]
+    # On the video timeline each shot after the first starts crossfade_duration early
+    assert sum(end - start for start, end in spans) - 2 * 0.5 == pytest.approx(3.0)
+
+
+def test_crossfades_only_between_scenes(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_timeline, "loudness_gain", lambda samples, sample_rate=None: 1.0)
+    scene_a, scene_b = _constant(tmp_path / "a.wav", 2.0, 0.25), _constant(tmp_path / "b.wav", 2.0, 0.5)
+    spans = audio_timeline.shot_spans(2.0, 2, crossfade_duration=0.5)
+
+    track = audio_timeline.build_narration_track(
+        [scene_a, scene_a, scene_b], [end - start for start, end in spans] + [2.0], crossfade_duration=0.5,
+        groups=[0, 0, 1]
+    )
+
+    rate = audio_timeline.SAMPLE_RATE
+    assert len(track) == int(3.5 * rate)  # 2.0 s + 2.0 s - one 0.5 s overlap between the scenes
+    assert np.allclose(track[:int(1.5 * rate)], 0.25, atol=1e-4)  # scene A is untouched across its shot cut
+    assert np.allclose(track[int(2.0 * rate):int(3.0 * rate)], 0.5, atol=1e-3)  # scene B after the crossfade
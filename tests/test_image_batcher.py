@@ -0,0 +1,70 @@
+import time
+import threading
+
+import pytest
+
+from pipeline import image_batcher
+
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def make(backend, **kwargs):
+        batchers.append(image_batcher.MicroBatcher(backend, **kwargs))
+        return batchers[-1]
+
+    yield make
+    for batcher in batchers:
+        batcher.close()
+
+
+def echo(payloads):
+    return [payload["inputs"] for payload in payloads]
+
+
+def test_results_fan_out_in_request_order(make_batcher):
+    batcher = make_batcher(echo, max_batch_size=8, max_wait_ms=100)
+
+    futures = [batcher.submit({"inputs": f"shot {i}"}) for i in range(5)]
+
+    assert [future.result(timeout=5) for future in futures] == [f"shot {i}" for i in range(5)]
+    assert list(batcher.batch_sizes) == [5]
+
+
+def test_batches_are_capped_at_max_batch_size(make_batcher):
+    release = threading.Event()
+    batches = []
+
+    def backend(payloads):
+        release.wait(5)
+        batches.append([payload["inputs"] for payload in payloads])
+        return echo(payloads)
+
+    batcher = make_batcher(backend, max_batch_size=3, max_wait_ms=100, max_inflight=3)
+    futures = [batcher.submit({"inputs": i}) for i in range(7)]
+    release.set()
+
+    assert [future.result(timeout=5) for future in futures] == list(range(7))
+    assert sorted(map(len, batches), reverse=True) == [3, 3, 1]
+
+
+def test_a_lone_request_waits_at_most_max_wait(make_batcher):
+    batcher = make_batcher(echo, max_batch_size=8, max_wait_ms=50)
+
+    start = time.monotonic()
+    assert batcher.submit({"inputs": "alone"}).result(timeout=5) == "alone"
+    assert 0.04 <= time.monotonic() - start < 0.5
+    assert list(batcher.batch_sizes) == [1]
+
+
+def test_a_failed_batch_fails_every_caller(make_batcher):
+    def backend(payloads):
+        raise ValueError("server exploded")
+
+    batcher = make_batcher(backend, max_batch_size=8, max_wait_ms=20)
+    futures = [batcher.submit({"inputs": i}) for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(image_batcher.ImageBatchError, match="server exploded"):
+            future.result(timeout=5)
@@ -0,0 +1,133 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline import image_scheduler
+
+ENDPOINTS = [{"name": "a", "url": "a", "timeout": 10}, {"name": "b", "url": "b", "timeout": 10}]
+DELAY = 0.2
+
+
+@pytest.fixture(autouse=True)
+def scheduler(monkeypatch):
+    """Fresh stats, pool and hedge budget; endpoints hedge after DELAY seconds."""
+    executor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(image_scheduler, "_stats", {})
+    monkeypatch.setattr(image_scheduler, "_executor", executor)
+    monkeypatch.setattr(image_scheduler, "_queued", 0)
+    monkeypatch.setattr(image_scheduler, "_hedge_tokens", image_scheduler.HEDGE_BUDGET_BURST)
+    monkeypatch.setattr(image_scheduler, "HEDGE_DEFAULT_DELAY", DELAY)
+    monkeypatch.setattr(image_scheduler, "HEDGE_MIN_DELAY", 0.0)
+    yield
+    executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def endpoints(monkeypatch):
+    """
+    Fake endpoints: `behaviour[name] = (seconds, result or exception)`. Returns the
+    (name, time sent) of every request.
+    """
+    behaviour, calls = {}, []
+
+    def request(endpoint, payload):
+        calls.append((endpoint["name"], time.monotonic()))
+        seconds, result = behaviour[endpoint["name"]]
+        time.sleep(seconds)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def request_async(endpoint, payload):
+        calls.append((endpoint["name"], time.monotonic()))
+        seconds, result = behaviour[endpoint["name"]]
+        await asyncio.sleep(seconds)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(image_scheduler, "_request_image", request)
+    monkeypatch.setattr(image_scheduler, "_request_image_async", request_async)
+    return behaviour, calls
+
+
+def test_hedge_fires_after_the_percentile_delay(endpoints):
+    behaviour, calls = endpoints
+    behaviour.update(a=(1.0, "slow"), b=(0.0, "fast"))
+
+    start = time.monotonic()
+    assert image_scheduler.request_image({}, ENDPOINTS) == "fast"
+    assert [name for name, _ in calls] == ["a", "b"]
+    assert calls[1][1] - start == pytest.approx(DELAY, abs=0.1)
+
+
+def test_first_response_wins(endpoints):
+    behaviour, calls = endpoints
+    behaviour.update(a=(0.3, "primary"), b=(1.0, "hedge"))
+
+    assert image_scheduler.request_image({}, ENDPOINTS) == "primary"
+    assert [name for name, _ in calls] == ["a", "b"]
+
+
+def test_no_hedge_without_budget(endpoints, monkeypatch):
+    behaviour, calls = endpoints
+    behaviour.update(a=(0.4, "primary"), b=(0.0, "hedge"))
+    monkeypatch.setattr(image_scheduler, "_hedge_tokens", 0.0)
+
+    assert image_scheduler.request_image({}, ENDPOINTS) == "primary"
+    assert [name for name, _ in calls] == ["a"]
+
+
+def test_hedge_timer_starts_when_the_request_is_sent(endpoints, monkeypatch):
+    behaviour, calls = endpoints
+    behaviour.update(a=(0.1, "primary"), b=(0.0, "hedge"))
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(image_scheduler, "_executor", executor)
+    executor.submit(time.sleep, 0.5)  # the primary waits in the queue for longer than DELAY
+
+    assert image_scheduler.request_image({}, ENDPOINTS) == "primary"
+    assert [name for name, _ in calls] == ["a"]
+    executor.shutdown(wait=True)
+
+
+def test_failover_after_primary_error(endpoints):
+    behaviour, calls = endpoints
+    behaviour.update(a=(0.0, ConnectionError("down")), b=(0.0, "backup"))
+
+    start = time.monotonic()
+    assert image_scheduler.request_image({}, ENDPOINTS) == "backup"
+    assert [name for name, _ in calls] == ["a", "b"]
+    assert calls[1][1] - start < DELAY  # no waiting for the hedge timer
+
+
+def test_error_when_every_request_fails(endpoints):
+    behaviour, calls = endpoints
+    behaviour.update(a=(0.0, ConnectionError("a down")), b=(0.0, ConnectionError("b down")))
+
+    with pytest.raises(image_scheduler.ImageRequestError, match="a down.*b down"):
+        image_scheduler.request_image({}, ENDPOINTS)
+
+
+def test_async_hedge_and_failover(endpoints):
+    behaviour, calls = endpoints
+    behaviour.update(a=(1.0, "slow"), b=(0.0, "fast"))
+    assert asyncio.run(image_scheduler.request_image_async({}, ENDPOINTS)) == "fast"
+
+    behaviour.update(a=(0.0, ConnectionError("down")), b=(0.0, "backup"))
+    assert asyncio.run(image_scheduler.request_image_async({}, ENDPOINTS)) == "backup"
+    assert [name for name, _ in calls] == ["a", "b", "a", "b"]
+
+
+def test_ranking_follows_recent_latency():
+    fast_then_slow, steady = image_scheduler._get_stats(ENDPOINTS[0]), image_scheduler._get_stats(ENDPOINTS[1])
+    for _ in range(200):
+        fast_then_slow.record_success(0.5)
+        steady.record_success(4.0)
+    assert image_scheduler.rank_endpoints(ENDPOINTS)[0]["name"] == "a"
+
+    # "a" slows down without failing; older fast samples decay away
+    for _ in range(3 * image_scheduler.DECAY_EVERY):
+        fast_then_slow.record_success(30.0)
+    assert image_scheduler.rank_endpoints(ENDPOINTS)[0]["name"] == "b"
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("moviepy")
+
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from pipeline import audio_timeline, image_store, render_queue
+
+
+def _tone(path, seconds):
+    t = np.arange(int(seconds * audio_timeline.SAMPLE_RATE)) / audio_timeline.SAMPLE_RATE
+    samples = 0.2 * np.sin(2 * np.pi * 440 * t)
+    return audio_timeline.write_wav(np.stack([samples, samples], axis=1).astype(np.float32), str(path))
+
+
+def _canvas(path):
+    from PIL import Image
+
+    Image.new("RGB", (64, 64), "red").save(str(path) + ".png")
+    return image_store.normalize_image(str(path) + ".png", str(path) + image_store.CANVAS_SUFFIX)
+
+
+@pytest.fixture(autouse=True)
+def _plain_subtitles(monkeypatch):
+    # TextClip needs ImageMagick; a plain bar keeps the test self-contained
+    import moviepy.editor
+
+    monkeypatch.setattr(moviepy.editor, "TextClip",
+                        lambda text, size, **kwargs: moviepy.editor.ColorClip((size[0], 40), color=(0, 0, 0)))
+
+
+@pytest.mark.parametrize("shots, edge_fade", [(1, 0.0), (2, 0.0), (3, 0.0), (2, 0.25)])
+def test_segment_keeps_full_narration(tmp_path, shots, edge_fade):
+    seconds = 1.5 * shots
+    audio_path = _tone(tmp_path / "scene.wav", seconds)
+    scenes = [{"image_path": _canvas(tmp_path / f"shot_{j}"), "audio_path": audio_path, "audio_part": [j, shots],
+               "subtitle_text": "A fox runs.", "scene_index": 0} for j in range(shots)]
+    video, narration = tmp_path / "segment.mp4", tmp_path / "segment.wav"
+
+    render_queue.render_segment(scenes, str(video), str(narration), quality="draft", edge_fade=edge_fade)
+
+    # The scene lasts as long as its sentence, however many shots it is cut into
+    assert ffmpeg_parse_infos(str(video))["video_duration"] == pytest.approx(seconds, abs=0.1)
+    track = audio_timeline.decode_audio(str(narration))
+    assert len(track) / audio_timeline.SAMPLE_RATE == pytest.approx(seconds, abs=0.05)
+
+    # ...and plays unbroken (one gain, no overlapped shot boundaries) between the fades,
+    # which are as long as the video's (edge_fade for segments, else the crossfade)
+    source = audio_timeline.decode_audio(audio_path)
+    fade_out = edge_fade or 0.5
+    body = slice(int(edge_fade * audio_timeline.SAMPLE_RATE), int((seconds - fade_out) * audio_timeline.SAMPLE_RATE))
+    gain = np.sum(track[body] * source[body]) / np.sum(source[body] ** 2)
+    assert np.max(np.abs(track[body] - gain * source[body])) < 1e-3
+
+
+def test_segment_narration_fades_with_the_video(tmp_path):
+    audio_path = _tone(tmp_path / "scene.wav", 1.5)
+    scenes = [{"image_path": _canvas(tmp_path / "shot"), "audio_path": audio_path, "audio_part": [0, 1],
+               "subtitle_text": "A fox runs.", "scene_index": 0}]
+    narration = tmp_path / "segment.wav"
+
+    render_queue.render_segment(scenes, str(tmp_path / "segment.mp4"), str(narration), quality="draft", edge_fade=0.25)
+
+    track, rate = audio_timeline.decode_audio(str(narration)), audio_timeline.SAMPLE_RATE
+    level = np.max(np.abs(track[int(0.5 * rate):int(1.0 * rate)]))
+    assert np.max(np.abs(track[:int(0.01 * rate)])) < 0.1 * level                    # fades in...
+    assert np.max(np.abs(track[int(1.15 * rate):int(1.25 * rate)])) > 0.9 * level    # ...sentence intact until 1.25 s
+    assert np.max(np.abs(track[-int(0.01 * rate):])) < 0.1 * level                   # ...and out with the video
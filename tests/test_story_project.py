@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from pipeline import (
+    story_project,
+    module2_voiceover,
+    module3_image_generation,
+    module4_postproduction,
+    render_queue,
+    job_metrics
+)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A one-scene project whose providers and renderer are stubbed out."""
+    monkeypatch.setattr(job_metrics, "METRICS_DB", "")
+    monkeypatch.setattr(module2_voiceover, "translate_text", lambda text, lang: text)
+
+    # Providers fail (silent audio / grey placeholder) while failures[kind] > 0
+    failures = {"audio": 0, "image": 0}
+
+    def generate_audio(text, lang, filename, report_fallback=False, **kwargs):
+        failed = failures["audio"] > 0
+        failures["audio"] -= failed
+        open(filename, "wb").write(b"silence" if failed else b"speech")
+        return not (failed and report_fallback)
+
+    monkeypatch.setattr(module2_voiceover, "generate_audio", generate_audio)
+
+    def generate_image(visual_prompt, updated_cast, filename, shot_type, seed_offset=0):
+        failed = failures["image"] > 0
+        failures["image"] -= failed
+        Image.new("RGB", (64, 64), "grey" if failed else "red").save(filename)
+        return not failed
+
+    monkeypatch.setattr(module3_image_generation, "generate_image", generate_image)
+
+    # Segments record the colour of the canvas they were rendered from
+    rendered = []
+
+    def render_segment(scenes, video_filename, narration_filename, quality="final", edge_fade=0.0):
+        audio = open(scenes[0]["audio_path"], "rb").read().decode()
+        rendered.append((audio, [tuple(np.load(s["image_path"])[540, 960]) for s in scenes]))
+        for path in (video_filename, narration_filename):
+            open(path, "wb").write(b"segment")
+
+    monkeypatch.setattr(render_queue, "render_segment", render_segment)
+    monkeypatch.setattr(module4_postproduction, "concatenate_segments",
+                        lambda segments, output_filename, quality="final": open(output_filename, "wb").write(b"story"))
+
+    project = story_project.StoryProject(str(tmp_path), {
+        "prompt": "A fox", "language": "English", "tone": "Default", "voice_id": "voice", "quality": "draft",
+        "rich_concept": "", "cast_list": [],
+        "scenes": [{"sentence": "A fox runs.", "characters": [{"name": "Fox"}], "shot_type": "wide",
+                    "shots": [{"prompt": "a fox running", "variant": 0}]}],
+        "nodes": {},
+    })
+    project.save()
+    project.rendered, project.failures = rendered, failures
+    return project
+
+
+def test_placeholder_image_is_retried_downstream(project):
+    project.failures["image"] = 1
+    project.render()
+    assert project.rendered == [("speech", [(128, 128, 128)])]
+
+    # Everything built from the placeholder is stale, not only the image itself
+    stale = project.stale_nodes()
+    assert stale == ["scene_01/shot_01/image", "scene_01/shot_01/canvas", "scene_01/segment", "final"]
+
+    project.render()
+    assert project.last_build["rebuilt"] == stale
+    assert project.rendered[-1] == ("speech", [(255, 0, 0)])
+    assert project.stale_nodes() == []
+    assert os.path.exists(os.path.join(project.folder, "draft_story.mp4"))
+
+
+def test_silent_fallback_audio_is_retried_downstream(project):
+    project.failures["audio"] = 1
+    project.render()
+    assert project.rendered == [("silence", [(255, 0, 0)])]
+
+    stale = project.stale_nodes()
+    assert stale == ["scene_01/audio", "scene_01/segment", "final"]
+
+    project.render()
+    assert project.last_build["rebuilt"] == stale
+    assert project.rendered[-1] == ("speech", [(255, 0, 0)])
+    assert project.stale_nodes() == []